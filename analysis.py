@@ -0,0 +1,657 @@
+import os
+import time
+import hashlib
+import argparse
+import warnings
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import matplotlib
+import matplotlib.pyplot as plt
+from matplotlib import cbook
+import seaborn as sns
+from scipy.stats import t as t_dist
+
+try:
+    import statsmodels  # noqa: F401  (só para a curva lowess da RQ3)
+    LOWESS_AVAILABLE = True
+except ImportError:
+    LOWESS_AVAILABLE = False
+
+DATASET_PATH = os.getenv("DATASET_PATH", "dataset.csv")
+ANALYSIS_CACHE_DIR = os.getenv("ANALYSIS_CACHE_DIR", ".cache/analysis")
+FIGURES_DIR = os.getenv("FIGURES_DIR", "assets")
+BOOTSTRAP_SAMPLES = int(os.getenv("BOOTSTRAP_SAMPLES", "1000"))
+BOOTSTRAP_SEED = int(os.getenv("BOOTSTRAP_SEED", "12345"))
+BOOTSTRAP_BATCH = int(os.getenv("BOOTSTRAP_BATCH", "25"))
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+GROUPED_POOL_MIN_ROWS = int(os.getenv("GROUPED_POOL_MIN_ROWS", "500000"))
+REPOSITORIES_PATH = os.getenv("REPOSITORIES_PATH", "repositorios.csv")
+RENDER_MAX_POINTS = int(os.getenv("RENDER_MAX_POINTS", "10000"))
+RENDER_STRATA = int(os.getenv("RENDER_STRATA", "20"))
+RENDER_SEED = int(os.getenv("RENDER_SEED", "0"))
+
+# Esquema canônico = o que main.py grava hoje; os tipos são os menores que comportam os dados.
+DATASET_DTYPES = {
+    "owner": "category", "repo_name": "category", "repo": "category", "stars": "int32", "html_url": "category",
+    "total_closed_prs": "int32", "pr_id": "int64", "pr_number": "int32", "state": "category", "author": "category",
+    "num_files": "int32", "additions": "int32", "deletions": "int32",
+    "analysis_time_hours": "float32",
+    "description_length": "int32",
+    "participants_count": "int32", "comments_count": "int32", "issue_comments_count": "int32",
+    "reviews_count": "int32",
+    # Extratores extras de rebuild.py.
+    "first_review_hours": "float32", "reviewers_count": "int32",
+}
+
+# Colunas do dataset.csv antigo (gerado pela primeira versão do coletor) -> esquema canônico.
+LEGACY_COLUMNS = {
+    "id": "pr_id",
+    "tempo_analise_horas": "analysis_time_hours",
+    "descricao_len": "description_length",
+    "num_comentarios": "issue_comments_count",
+    "num_review_comments": "comments_count",
+    "num_participants": "participants_count",
+    "autor": "author",
+}
+
+
+def _normalize(name: str) -> str:
+    return name.strip().lower().replace(" ", "_")
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _read_source(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+        df.columns = [_normalize(c) for c in df.columns]
+        df = df.rename(columns=LEGACY_COLUMNS)
+        return df.astype({c: t for c, t in DATASET_DTYPES.items() if c in df.columns})
+
+    header = pd.read_csv(path, nrows=0).columns
+    # Tipos já na leitura (por nome de origem), para o parser não inferir int64/object e converter depois.
+    source_to_canonical = {c: LEGACY_COLUMNS.get(_normalize(c), _normalize(c)) for c in header}
+    usecols = [c for c, canon in source_to_canonical.items() if canon in DATASET_DTYPES]
+    dtype = {c: DATASET_DTYPES[source_to_canonical[c]] for c in usecols}
+    df = pd.read_csv(path, usecols=usecols, dtype=dtype)
+    return df.rename(columns=source_to_canonical)
+
+
+def load_dataset(path: str = DATASET_PATH, cache_dir: str = ANALYSIS_CACHE_DIR) -> pd.DataFrame:
+    # O DataFrame tipado fica em cache binário (pickle) com o hash do arquivo de origem no nome:
+    # editar ou regerar o dataset invalida o cache sozinho.
+    digest = _file_hash(path)[:16]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cached = os.path.join(cache_dir, f"{stem}-{digest}.pkl")
+    if os.path.exists(cached):
+        return pd.read_pickle(cached)
+
+    df = _read_source(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    for old in os.listdir(cache_dir):
+        if old.startswith(f"{stem}-") and old.endswith(".pkl"):
+            os.remove(os.path.join(cache_dir, old))
+    df.to_pickle(cached)
+    return df
+
+
+def reviews_column(df: pd.DataFrame) -> str:
+    # O dataset antigo não tem o total de revisões; os scripts originais usavam os comentários de revisão.
+    return "reviews_count" if "reviews_count" in df.columns else "comments_count"
+
+
+# Métricas das RQs por tema; correlation_table cruza todos os pares das que existirem no dataset.
+METRIC_GROUPS = {
+    "tamanho": ["num_files", "additions", "deletions"],
+    "tempo": ["analysis_time_hours", "first_review_hours"],
+    "descrição": ["description_length"],
+    "interações": ["participants_count", "comments_count", "issue_comments_count"],
+    "revisões": ["reviews_count", "reviewers_count"],
+}
+
+
+def metric_columns(df: pd.DataFrame) -> list[str]:
+    return [c for cols in METRIC_GROUPS.values() for c in cols if c in df.columns]
+
+
+def rank_groups(X: np.ndarray) -> list[np.ndarray]:
+    # Ranqueia cada coluna uma única vez: id denso do valor (empates compartilham o id). Os postos de qualquer
+    # reamostragem saem daí por contagem, sem ordenar de novo.
+    return [np.unique(X[:, j], return_inverse=True)[1] for j in range(X.shape[1])]
+
+
+def _weighted_ranks(groups: list[np.ndarray], w: np.ndarray) -> np.ndarray:
+    # Posto médio de cada linha numa amostra em que a linha i aparece w[i] vezes: para o grupo de empate g,
+    # (linhas antes de g) + (cópias em g + 1) / 2. Com w = 1 é o rankdata(method="average") de sempre.
+    R = np.empty((len(w), len(groups)))
+    for j, gid in enumerate(groups):
+        counts = np.bincount(gid, weights=w)
+        avg = np.cumsum(counts) - counts + (counts + 1) / 2
+        R[:, j] = avg[gid]
+    return R
+
+
+def _weighted_corr(R: np.ndarray, w: np.ndarray) -> np.ndarray:
+    # Pearson ponderado de todas as colunas de uma vez (uma multiplicação de matrizes): matriz de Spearman.
+    total = w.sum()
+    Rc = R - (w @ R) / total
+    cov = (Rc * w[:, None]).T @ Rc
+    sd = np.sqrt(np.diag(cov))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return cov / np.outer(sd, sd)
+
+
+def spearman_matrix(X: np.ndarray, groups: list[np.ndarray] | None = None) -> tuple[np.ndarray, np.ndarray]:
+    # Mesmos ρ e p do scipy.stats.spearmanr (teste t com n - 2 graus de liberdade), para todos os pares.
+    # Como no nan_policy="propagate" do scipy, coluna com NaN dá ρ e p NaN (rank_groups trataria NaN como valor).
+    groups = rank_groups(X) if groups is None else groups
+    n = X.shape[0]
+    rho = _weighted_corr(_weighted_ranks(groups, np.ones(n)), np.ones(n))
+    has_nan = np.isnan(X).any(axis=0)
+    rho[has_nan, :] = rho[:, has_nan] = np.nan
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = rho * np.sqrt((n - 2) / np.clip((1 - rho) * (1 + rho), 0, None))
+    p = 2 * t_dist.sf(np.abs(t), n - 2) if n > 2 else np.full_like(rho, np.nan)
+    return rho, p
+
+
+def complete_blocks(X: np.ndarray) -> list[tuple[list[int], np.ndarray | None]]:
+    # Exclusão pareada de NaN sem voltar a um par por vez: as colunas completas formam um bloco com todas as
+    # linhas; cada coluna com NaN entra num bloco com elas (só nas linhas em que tem valor), e cada par de
+    # colunas com NaN num bloco próprio. Devolve (colunas, máscara de linhas ou None = todas).
+    missing = np.isnan(X)
+    nan_cols = [j for j in range(X.shape[1]) if missing[:, j].any()]
+    clean = [j for j in range(X.shape[1]) if j not in nan_cols]
+    blocks = [(clean, None)]
+    for a, c in enumerate(nan_cols):
+        blocks.append((clean + [c], ~missing[:, c]))
+        blocks += [([c, d], ~missing[:, c] & ~missing[:, d]) for d in nan_cols[a + 1:]]
+    return blocks
+
+
+def _bootstrap_batch(groups: list[np.ndarray], n: int, size: int, seed: np.random.SeedSequence) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    out = np.empty((size, len(groups), len(groups)))
+    for b in range(size):
+        # Reamostrar com reposição = contar quantas vezes cada linha foi sorteada.
+        w = np.bincount(rng.integers(0, n, n), minlength=n).astype(float)
+        out[b] = _weighted_corr(_weighted_ranks(groups, w), w)
+    return out
+
+
+def bootstrap_spearman(X: np.ndarray, n_boot: int = BOOTSTRAP_SAMPLES, seed=BOOTSTRAP_SEED,
+                       executor: ThreadPoolExecutor | None = None, groups: list[np.ndarray] | None = None):
+    # Distribuição bootstrap da matriz de Spearman, em lotes. Cada lote tem sua semente derivada de `seed`
+    # (SeedSequence.spawn), então o resultado é o mesmo com 1 ou N workers. O NumPy libera o GIL nas
+    # contas pesadas, por isso threads bastam e os dados não são copiados entre processos.
+    groups = rank_groups(X) if groups is None else groups
+    n, k = X.shape
+    # Lote de tamanho fixo (não depende do nº de workers), para as sementes e o resultado também não dependerem.
+    sizes = [min(BOOTSTRAP_BATCH, n_boot - i) for i in range(0, n_boot, BOOTSTRAP_BATCH)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if executor is None:
+        parts = [_bootstrap_batch(groups, n, size, ss) for size, ss in zip(sizes, seeds)]
+    else:
+        parts = [f.result() for f in [executor.submit(_bootstrap_batch, groups, n, size, ss)
+                                      for size, ss in zip(sizes, seeds)]]
+    return np.concatenate(parts) if parts else np.empty((0, k, k))
+
+
+def spearman(df: pd.DataFrame, x: str, y: str) -> dict:
+    data = df[[x, y]].dropna()
+    rho, p = spearman_matrix(data.to_numpy(dtype=float))
+    return {"x": x, "y": y, "n": len(data), "rho": float(rho[0, 1]), "p": float(p[0, 1])}
+
+
+def correlation_table(df: pd.DataFrame, cols: list[str] | None = None, by: list[str] | None = None,
+                      n_boot: int = BOOTSTRAP_SAMPLES, seed: int = BOOTSTRAP_SEED, alpha: float = 0.05,
+                      workers: int = ANALYSIS_WORKERS, min_rows: int = 10) -> pd.DataFrame:
+    # Todos os pares de métricas, no dataset inteiro e em cada recorte de `by` (ex.: state, repo), com IC
+    # percentil do bootstrap. Cada recorte ganha uma semente própria derivada de `seed` e do seu rótulo.
+    cols = metric_columns(df) if cols is None else cols
+    data = df[cols + list(by or [])]
+    splits = [("todos", "", data)]
+    for col in by or []:
+        splits += [(col, str(key), part) for key, part in data.groupby(col, observed=True, sort=True)]
+
+    rows = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        for split, key, part in splits:
+            if len(part) < min_rows:
+                continue
+            X_all = part[cols].to_numpy(dtype=float)
+            label = int.from_bytes(hashlib.sha256(f"{split}={key}".encode()).digest()[:4], "little")
+            found = {}
+            for b, (idx, mask) in enumerate(complete_blocks(X_all)):
+                X = X_all[:, idx] if mask is None else X_all[mask][:, idx]
+                if len(idx) < 2 or len(X) < min_rows:
+                    continue
+                groups = rank_groups(X)
+                rho, p = spearman_matrix(X, groups)
+                if n_boot > 0:
+                    # O bloco sem NaN mantém a semente do recorte; os demais derivam uma a partir dela.
+                    boot = bootstrap_spearman(X, n_boot, [seed, label] + ([b] if b else []), ex, groups)
+                    with warnings.catch_warnings():
+                        # Coluna constante no recorte (ex.: um repo sem deleções): ρ indefinido, IC fica NaN.
+                        warnings.simplefilter("ignore", RuntimeWarning)
+                        low, high = np.nanpercentile(boot, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+                else:
+                    low = high = np.full_like(rho, np.nan)
+                for a, i in enumerate(idx):
+                    for c, j in enumerate(idx[a + 1:], a + 1):
+                        # Cada par vem do primeiro bloco que o contém: o que tem só as linhas completas dele.
+                        found.setdefault((min(i, j), max(i, j)), {
+                            "n": len(X), "rho": rho[a, c], "p": p[a, c], "ci_low": low[a, c], "ci_high": high[a, c]})
+            for i, j in zip(*np.triu_indices(len(cols), k=1)):
+                stats = found.get((i, j), {"n": 0, "rho": np.nan, "p": np.nan, "ci_low": np.nan, "ci_high": np.nan})
+                rows.append({"split": split, "group": key, "x": cols[i], "y": cols[j], **stats})
+    return pd.DataFrame(rows)
+
+
+def check_spearman(seed: int = BOOTSTRAP_SEED, n: int = 500) -> list[str]:
+    # Confere o motor de Spearman com o scipy.stats.spearmanr em dados com empates e NaN; devolve as divergências.
+    from scipy.stats import spearmanr
+
+    problems = []
+    X = np.array([[1, 2], [2, 1], [3, 4], [np.nan, 3], [5, 6], [6, 5]])
+    rho, _ = spearman_matrix(X)
+    if not np.isnan(rho[0, 1]):
+        problems.append(f"spearman_matrix com NaN: ρ={rho[0, 1]:.3f}, esperado NaN (nan_policy='propagate')")
+
+    rng = np.random.default_rng(seed)
+    cols = ["a", "b", "c", "d"]
+    df = pd.DataFrame(rng.integers(0, 20, (n, len(cols))).astype(float), columns=cols)
+    df["b"] += df["a"]
+    for col, frac in (("c", 0.2), ("d", 0.35)):
+        df.loc[rng.random(n) < frac, col] = np.nan
+    table = correlation_table(df, cols, n_boot=0, workers=1)
+    for row in table.itertuples():
+        ref = spearmanr(df[row.x], df[row.y], nan_policy="omit")
+        n_ref = int(df[[row.x, row.y]].notna().all(axis=1).sum())
+        if row.n != n_ref or not np.allclose([row.rho, row.p], [ref[0], ref[1]], rtol=1e-9, atol=1e-12):
+            problems.append(f"correlation_table {row.x}×{row.y}: n={row.n} ρ={row.rho:.6f} p={row.p:.3g}; "
+                            f"scipy n={n_ref} ρ={ref[0]:.6f} p={ref[1]:.3g}")
+    for x, y in (("a", "c"), ("c", "d")):
+        res, ref = spearman(df, x, y), spearmanr(df[x], df[y], nan_policy="omit")
+        if not np.isclose(res["rho"], ref[0], rtol=1e-9):
+            problems.append(f"spearman {x}×{y}: ρ={res['rho']:.6f}, scipy {ref[0]:.6f}")
+    return problems
+
+
+# Desfechos das RQs: RQ01-04 medem o feedback (comentários de revisão), RQ05-08 o nº de revisões.
+RQ_OUTCOMES = ["comments_count", "reviews_count"]
+
+
+def rq_pairs(df: pd.DataFrame) -> list[tuple[str, str]]:
+    outcomes = [c for c in RQ_OUTCOMES if c in df.columns]
+    return [(x, y) for y in outcomes for x in metric_columns(df) if x not in RQ_OUTCOMES]
+
+
+def _rank_within(codes: np.ndarray, starts: np.ndarray, vid: np.ndarray) -> np.ndarray:
+    # Posto médio dentro de cada grupo com uma ordenação só: chave (grupo, id denso do valor) de rank_groups;
+    # cada chave distinta é um bloco de empate, e o posto é relativo ao início do grupo. Função de módulo
+    # para poder rodar no ProcessPoolExecutor.
+    base = int(vid.max()) + 1
+    keys, inverse, counts = np.unique(codes.astype(np.int64) * base + vid, return_inverse=True, return_counts=True)
+    avg = np.cumsum(counts) - counts + (counts + 1) / 2 - starts[keys // base]
+    return avg[inverse]
+
+
+def _grouped_ranks(codes: np.ndarray, vids: list[np.ndarray], ex: ProcessPoolExecutor | None) -> np.ndarray:
+    sizes = np.bincount(codes)
+    starts = np.cumsum(sizes) - sizes
+    if ex is None:
+        return np.stack([_rank_within(codes, starts, vid) for vid in vids], axis=1)
+    # Uma coluna por tarefa, em processos; a cópia dos arrays só se paga com muitas linhas (GROUPED_POOL_MIN_ROWS).
+    return np.stack(list(ex.map(_rank_within, [codes] * len(vids), [starts] * len(vids), vids)), axis=1)
+
+
+def _grouped_spearman(codes: np.ndarray, R: np.ndarray, pairs: list[tuple[int, int]], n_groups: int):
+    # Pearson dos postos por grupo, todos os grupos de uma vez: somas por grupo com bincount.
+    n = np.bincount(codes, minlength=n_groups).astype(float)
+    sums = np.stack([np.bincount(codes, R[:, j], n_groups) for j in range(R.shape[1])], axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        D = R - (sums / n[:, None])[codes]
+    ss = np.stack([np.bincount(codes, D[:, j] ** 2, n_groups) for j in range(R.shape[1])], axis=1)
+    rho = np.empty((n_groups, len(pairs)))
+    for k, (i, j) in enumerate(pairs):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rho[:, k] = np.bincount(codes, D[:, i] * D[:, j], n_groups) / np.sqrt(ss[:, i] * ss[:, j])
+    df_t = (n - 2)[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = rho * np.sqrt(df_t / np.clip((1 - rho) * (1 + rho), 0, None))
+        p = np.where(df_t > 0, 2 * t_dist.sf(np.abs(t), np.clip(df_t, 1, None)), np.nan)
+    return n, rho, p
+
+
+def _grouped_table(data: pd.DataFrame, col: str, cols: list[str], pairs: list[tuple[str, str]], idx, vids, ex,
+                   repos: list[str] | None) -> pd.DataFrame:
+    grouped = data.groupby(col, observed=True, sort=True)
+    codes = grouped.ngroup().to_numpy()
+    medians = grouped[cols].median()
+    n, rho, p = _grouped_spearman(codes, _grouped_ranks(codes, vids, ex), idx, len(medians))
+    table = pd.DataFrame({"split": col, "group": medians.index.astype(str), "n": n.astype("int32")})
+    table[[f"median_{c}" for c in cols]] = medians.to_numpy(dtype="float32")
+    table[[f"rho_{x}__{y}" for x, y in pairs]] = rho.astype("float32")
+    table[[f"p_{x}__{y}" for x, y in pairs]] = p.astype("float32")
+    if col == "repo" and repos is not None:
+        missing = sorted(set(repos) - set(table["group"]))
+        table = pd.concat([table, pd.DataFrame({"split": col, "group": missing, "n": np.int32(0)})],
+                          ignore_index=True)
+    return table
+
+
+def grouped_stats(df: pd.DataFrame, by: list[str] | None = None, pairs: list[tuple[str, str]] | None = None,
+                  repos: list[str] | None = None, workers: int = ANALYSIS_WORKERS) -> pd.DataFrame:
+    # Uma linha por grupo de cada recorte em `by` (padrão: repo e state): n, medianas das métricas e ρ/p de
+    # Spearman dos pares das RQs. Com `repos` (ex.: repositorios.csv), repositórios sem PRs entram com n=0.
+    by = by or ["repo", "state"]
+    pairs = rq_pairs(df) if pairs is None else pairs
+    cols = list(dict.fromkeys(c for pair in pairs for c in pair))
+    data = df[cols + by].dropna(subset=cols)
+    # Ids densos dos valores calculados uma vez e reaproveitados em todos os recortes.
+    vids = rank_groups(data[cols].to_numpy(dtype=float))
+    idx = [(cols.index(x), cols.index(y)) for x, y in pairs]
+    use_pool = workers > 1 and len(data) >= GROUPED_POOL_MIN_ROWS
+
+    tables = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(cols))) if use_pool else nullcontext() as ex:
+        for col in by:
+            tables.append(_grouped_table(data, col, cols, pairs, idx, vids, ex, repos))
+    return pd.concat(tables, ignore_index=True)
+
+
+def read_repositories(path: str = REPOSITORIES_PATH) -> list[str] | None:
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path, usecols=["full_name"])["full_name"].dropna().tolist()
+
+
+def write_table(table: pd.DataFrame, path: str):
+    if path.endswith(".parquet"):
+        table.to_parquet(path, index=False)
+    else:
+        table.to_csv(path, index=False)
+
+
+def refresh_grouped_stats(dataset: str, out: str, repos_path: str = REPOSITORIES_PATH) -> pd.DataFrame:
+    # Chamado por main.py ao fim de cada coleta (GROUPED_STATS_OUTPUT / --grouped-stats).
+    table = grouped_stats(load_dataset(dataset), repos=read_repositories(repos_path))
+    write_table(table, out)
+    return table
+
+
+def _stratified_sample(data: pd.DataFrame, x: str, max_points: int = RENDER_MAX_POINTS) -> pd.DataFrame:
+    # Amostra proporcional por faixas de quantil de x: a densidade do gráfico se mantém e as caudas (PRs enormes,
+    # descrições longas) não somem. Semente fixa, para o PNG não mudar entre execuções.
+    if len(data) <= max_points:
+        return data
+    strata = pd.qcut(data[x].rank(method="first"), RENDER_STRATA, labels=False)
+    return data.groupby(strata).sample(frac=max_points / len(data), random_state=RENDER_SEED)
+
+
+def _linear_fit(x: np.ndarray, y: np.ndarray, grid: np.ndarray, level: float = 0.95):
+    # Reta de mínimos quadrados com a faixa de confiança analítica da média (o regplot fazia bootstrap sobre
+    # todos os pontos, o que dominava o tempo com o dataset grande).
+    n = len(x)
+    xm = x.mean()
+    sxx = ((x - xm) ** 2).sum()
+    slope = ((x - xm) * (y - y.mean())).sum() / sxx if sxx > 0 else 0.0
+    fit = y.mean() + slope * (grid - xm)
+    s = np.sqrt(((y - y.mean() - slope * (x - xm)) ** 2).sum() / max(1, n - 2))
+    half = t_dist.ppf((1 + level) / 2, max(1, n - 2)) * s * np.sqrt(1 / n + (grid - xm) ** 2 / (sxx or np.inf))
+    return fit, fit - half, fit + half
+
+
+def _regplot(df: pd.DataFrame, x: str, y: str, title: str, xlabel: str, ylabel: str, figsize=(9, 6),
+             lowess: bool = False) -> tuple:
+    # Prepara no processo principal só o que a figura precisa: amostra dos pontos e a curva já ajustada.
+    xs, ys = df[x].to_numpy(dtype=float), df[y].to_numpy(dtype=float)
+    sample = _stratified_sample(df[[x, y]], x)
+    grid = np.linspace(xs.min(), xs.max(), 100) if len(xs) else np.empty(0)
+    band = None
+    if lowess and len(sample) > 2:
+        # LOWESS aproximado: ajustado na amostra estratificada (custo limitado por RENDER_MAX_POINTS), com `delta`
+        # para interpolar entre pontos próximos em vez de reajustar em cada um.
+        from statsmodels.nonparametric.smoothers_lowess import lowess as sm_lowess
+        sx = sample[x].to_numpy(dtype=float)
+        curve = sm_lowess(sample[y].to_numpy(dtype=float), sx, delta=0.01 * np.ptp(sx))
+        line = (curve[:, 0], curve[:, 1])
+    elif len(xs) > 1:
+        fit, low, high = _linear_fit(xs, ys, grid)
+        line, band = (grid, fit), (grid, low, high)
+    else:
+        line = (grid, np.full_like(grid, np.nan))
+    spec = {"x": sample[x].to_numpy(), "y": sample[y].to_numpy(), "line": line, "band": band, "title": title,
+            "xlabel": xlabel, "ylabel": ylabel, "figsize": figsize}
+    return _draw_regplot, spec
+
+
+def _draw_regplot(x, y, line, band, title, xlabel, ylabel, figsize):
+    fig, ax = plt.subplots(figsize=figsize)
+    color = sns.color_palette()[0]
+    ax.scatter(x, y, s=40, alpha=0.4, color=color, linewidths=0)
+    ax.plot(*line, color="red", linewidth=2)
+    if band is not None:
+        ax.fill_between(*band, color="red", alpha=0.15, linewidth=0)
+    ax.set_title(title, fontsize=13)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(alpha=0.3)
+    fig.tight_layout()
+    return fig
+
+
+def _boxplot(values: pd.Series, groups: pd.Series, title: str, xlabel: str, ylabel: str, figsize=(8, 5)) -> tuple:
+    # Estatísticas das caixas calculadas aqui; dos outliers vai só uma amostra, o resto da figura não cresce com n.
+    labels = list(groups.cat.categories)
+    per_box = max(1, RENDER_MAX_POINTS // max(1, len(labels)))
+    rng = np.random.default_rng(RENDER_SEED)
+    stats = []
+    for label in labels:
+        vals = values[groups == label].to_numpy(dtype=float)
+        if not len(vals):
+            stats.append(None)
+            continue
+        st = cbook.boxplot_stats(vals, labels=[label])[0]
+        if len(st["fliers"]) > per_box:
+            st["fliers"] = rng.choice(st["fliers"], per_box, replace=False)
+        stats.append(st)
+    return _draw_boxplot, {"labels": labels, "stats": stats, "title": title, "xlabel": xlabel, "ylabel": ylabel,
+                           "figsize": figsize}
+
+
+def _draw_boxplot(labels, stats, title, xlabel, ylabel, figsize):
+    fig, ax = plt.subplots(figsize=figsize)
+    palette = sns.color_palette("Blues", len(labels))
+    present = [i for i, st in enumerate(stats) if st is not None]
+    boxes = ax.bxp([stats[i] for i in present], positions=present, patch_artist=True, widths=0.8,
+                   medianprops={"color": "0.25"}, flierprops={"marker": "d", "markersize": 4, "alpha": 0.5})
+    for i, patch in zip(present, boxes["boxes"]):
+        patch.set_facecolor(palette[i])
+    ax.set_xticks(range(len(labels)), labels)
+    ax.set_xlim(-0.5, len(labels) - 0.5)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(alpha=0.3)
+    fig.tight_layout()
+    return fig
+
+
+def rq3(df: pd.DataFrame) -> tuple[list[dict], dict]:
+    x, y = "description_length", "comments_count"
+    data = df[(df[x] > 0) & (df[y] >= 0)]
+    res = spearman(data, x, y)
+    figures = {"rq3": _regplot(
+        data, x, y,
+        "RQ03: Relação entre a descrição dos PRs e o feedback final das revisões\n"
+        f"(ρ = {res['rho']:.3f}, p < 0.0001)",
+        "Tamanho da descrição do PR (nº de caracteres)", "Número de comentários de revisão", lowess=LOWESS_AVAILABLE)}
+
+    bins = [0, 200, 500, 1000, 2000, 5000, max(5001, int(data[x].max()))]
+    faixas = pd.cut(data[x], bins=bins, labels=["≤200", "201-500", "501-1000", "1001-2000", "2001-5000", ">5000"])
+    figures["rq3_faixas"] = _boxplot(
+        data[y], faixas, "Distribuição de feedbacks (comentários) por faixa de tamanho da descrição",
+        "Faixa de caracteres da descrição", "Nº de comentários de revisão")
+    return [res], figures
+
+
+def _interactions(df: pd.DataFrame, y: str) -> tuple[pd.DataFrame, list[dict]]:
+    cols = ["participants_count"] + [c for c in ("issue_comments_count",) if c in df.columns]
+    data = df[(df[cols + [y]] >= 0).all(axis=1)]
+    return data, [spearman(data, c, y) for c in cols]
+
+
+def rq4(df: pd.DataFrame) -> tuple[list[dict], dict]:
+    y = "comments_count"
+    data, results = _interactions(df, y)
+    return results, {"rq4": _regplot(
+        data, "participants_count", y,
+        "RQ04 - Relação entre nº de participantes e feedback das revisões\n"
+        f"(ρ = {results[0]['rho']:.3f}, p < 0.0001)",
+        "Número de participantes no PR", "Número de comentários de revisão", figsize=(8, 6))}
+
+
+def rq7(df: pd.DataFrame) -> tuple[list[dict], dict]:
+    x, y = "description_length", reviews_column(df)
+    data = df[(df[x] > 0) & (df[y] >= 0)]
+    res = spearman(data, x, y)
+    return [res], {"rq7": _regplot(
+        data, x, y,
+        "RQ07 - Relação entre a descrição dos PRs e o número de revisões\n"
+        f"(ρ = {res['rho']:.3f}, p < 0.0001)",
+        "Tamanho da descrição do PR (nº de caracteres)", "Número de revisões realizadas")}
+
+
+def rq8(df: pd.DataFrame) -> tuple[list[dict], dict]:
+    y = reviews_column(df)
+    data, results = _interactions(df, y)
+    return results, {"rq8": _regplot(
+        data, "participants_count", y,
+        "RQ08 - Relação entre nº de participantes e nº de revisões realizadas\n"
+        f"(ρ = {results[0]['rho']:.3f}, p < 0.0001)",
+        "Número de participantes no PR", "Número de revisões realizadas", figsize=(8, 6))}
+
+
+RQS = {"rq3": rq3, "rq4": rq4, "rq7": rq7, "rq8": rq8}
+
+
+def _headless():
+    matplotlib.use("Agg")
+
+
+def _render(name: str, draw, spec: dict, out_dir: str) -> str:
+    fig = draw(**spec)
+    path = os.path.join(out_dir, f"{name}.png")
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+    return path
+
+
+def render_figures(figures: dict, out_dir: str, workers: int = ANALYSIS_WORKERS) -> list[str]:
+    # Cada figura é independente e o desenho no Agg é CPU puro em Python: processos em paralelo, uma figura por
+    # tarefa. As especificações já vêm amostradas, então o que vai para os workers é pequeno.
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [(name, draw, spec) for name, (draw, spec) in figures.items()]
+    if workers <= 1 or len(jobs) <= 1:
+        return [_render(name, draw, spec, out_dir) for name, draw, spec in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_headless) as ex:
+        futures = [ex.submit(_render, name, draw, spec, out_dir) for name, draw, spec in jobs]
+        return [f.result() for f in futures]
+
+
+def run(names, df: pd.DataFrame, out_dir: str | None = FIGURES_DIR, show: bool = False,
+        workers: int = ANALYSIS_WORKERS) -> list[dict]:
+    # Roda as RQs pedidas sobre o mesmo DataFrame; com out_dir as figuras vão para PNG, com show para a tela.
+    results, figures = [], {}
+    for name in names:
+        rq_results, rq_figures = RQS[name](df)
+        for res in rq_results:
+            print(f"[{name}] Spearman ({res['x']} vs {res['y']}, n={res['n']}): ρ = {res['rho']:.3f}, p = {res['p']:.4g}",
+                  flush=True)
+            results.append({"rq": name, **res})
+        figures.update(rq_figures)
+
+    if show and matplotlib.get_backend().lower() == "agg":
+        # Sem display (ex.: nó de batch): em vez de perder as figuras no plt.show(), grava os PNGs.
+        print(f"[figuras] backend sem tela; gravando em {out_dir or FIGURES_DIR}/", flush=True)
+        show, out_dir = False, out_dir or FIGURES_DIR
+    if not show:
+        if out_dir:
+            render_figures(figures, out_dir, workers)
+        return results
+
+    opened = [draw(**spec) for draw, spec in figures.values()]
+    for name, fig in zip(figures, opened):
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+            fig.savefig(os.path.join(out_dir, f"{name}.png"), dpi=100)
+    plt.show()
+    for fig in opened:
+        plt.close(fig)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roda as RQs sobre o dataset num único processo.")
+    parser.add_argument("rqs", nargs="*", metavar="RQ", help=f"RQs a rodar: {', '.join(RQS)} (padrão: todas)")
+    parser.add_argument("--dataset", default=DATASET_PATH, help="CSV ou Parquet gerado por main.py")
+    parser.add_argument("--out-dir", default=FIGURES_DIR, help="pasta dos PNGs ('' para não gravar)")
+    parser.add_argument("--show", action="store_true", help="abre as figuras na tela")
+    parser.add_argument("--correlations", metavar="CSV",
+                        help="grava a matriz de Spearman de todos os pares de métricas, com IC bootstrap")
+    parser.add_argument("--grouped", metavar="ARQUIVO",
+                        help="grava medianas e ρ/p das RQs por repositório e por estado (CSV ou .parquet)")
+    parser.add_argument("--repos", default=REPOSITORIES_PATH, help="lista de repositórios para --grouped")
+    parser.add_argument("--by", action="append", choices=("state", "repo"), default=[],
+                        help="recortes adicionais da matriz / recortes do --grouped (pode repetir)")
+    parser.add_argument("--bootstrap", type=int, default=BOOTSTRAP_SAMPLES, help="reamostragens (0 desliga o IC)")
+    parser.add_argument("--seed", type=int, default=BOOTSTRAP_SEED)
+    parser.add_argument("--workers", type=int, default=ANALYSIS_WORKERS)
+    parser.add_argument("--check", action="store_true",
+                        help="confere o Spearman com o scipy (dados sintéticos com NaN) e sai com código 1 se divergir")
+    args = parser.parse_args()
+    if args.check:
+        problems = check_spearman(args.seed)
+        for msg in problems:
+            print(f"[check] FALHA {msg}", flush=True)
+        print(f"[check] {'OK' if not problems else f'{len(problems)} divergências'}", flush=True)
+        raise SystemExit(1 if problems else 0)
+    unknown = [name for name in args.rqs if name not in RQS]
+    if unknown:
+        parser.error(f"RQ desconhecida: {', '.join(unknown)}")
+    if not args.show:
+        # Modo batch: Agg não precisa de display, então roda igual em nó sem tela.
+        matplotlib.use("Agg")
+
+    t0 = time.perf_counter()
+    df = load_dataset(args.dataset)
+    print(f"[dataset] {args.dataset}: {len(df)} linhas, {df.memory_usage(deep=True).sum() / 1e6:.1f} MB em memória "
+          f"({time.perf_counter() - t0:.2f}s)", flush=True)
+    if args.correlations:
+        t0 = time.perf_counter()
+        table = correlation_table(df, by=args.by, n_boot=args.bootstrap, seed=args.seed, workers=args.workers)
+        table.to_csv(args.correlations, index=False)
+        print(f"[correlações] {len(table)} pares em {table[['split', 'group']].drop_duplicates().shape[0]} recortes, "
+              f"{args.bootstrap} reamostragens -> {args.correlations} ({time.perf_counter() - t0:.2f}s)", flush=True)
+    if args.grouped:
+        t0 = time.perf_counter()
+        table = grouped_stats(df, by=args.by or None, repos=read_repositories(args.repos), workers=args.workers)
+        write_table(table, args.grouped)
+        print(f"[grupos] {len(table)} grupos ({', '.join(table['split'].unique())}) -> {args.grouped} "
+              f"({time.perf_counter() - t0:.2f}s)", flush=True)
+    if (args.correlations or args.grouped) and not args.rqs:
+        raise SystemExit(0)
+    t0 = time.perf_counter()
+    run(args.rqs or list(RQS), df, out_dir=args.out_dir or None, show=args.show, workers=args.workers)
+    print(f"[figuras] {time.perf_counter() - t0:.2f}s", flush=True)
@@ -0,0 +1,272 @@
+import os
+import json
+import time
+import asyncio
+
+import aiohttp
+
+from main import (
+    BASE_URL, DEFAULT_HEADERS, TOKENS, TIMEOUT, CACHE, SEARCH_PACER,
+    MAX_DEEP_PRS_PER_REPO, MIN_CLOSED_PRS, MIN_ANALYSIS_HOURS, ELIGIBILITY_STRATEGY, ELIGIBILITY_BATCH, REVIEWS_PROBE,
+    _conditional_headers, _retry_delay, _backoff_seconds, _store_response, _is_primary_rate_limit,
+    _is_secondary_rate_limit, _link_unknown, _resource_for, RateBucket, RATE_DEFAULT_LIMITS,
+    _pr_duration_hours, _pr_ttl, _last_page, _batched, ttl_for, build_pr_row, eligibility_item, annotate_repo_rows,
+    prefilter_listed_prs, drop_unreviewed_prs,
+)
+
+ASYNC_CONCURRENCY = int(os.getenv("ASYNC_CONCURRENCY", "64"))
+ASYNC_PER_TOKEN = int(os.getenv("ASYNC_PER_TOKEN", "8"))
+ASYNC_REPO_CONCURRENCY = int(os.getenv("ASYNC_REPO_CONCURRENCY", "12"))
+
+
+class AsyncTokenSession:
+    def __init__(self, token: str, per_token: int):
+        self.token = token
+        self.headers = {"Authorization": f"token {token}"}
+        # Uma cota por recurso (core/search/graphql), como no TokenScheduler: a search zerada não trava o core.
+        self.buckets = {name: RateBucket(limit) for name, limit in RATE_DEFAULT_LIMITS.items()}
+        self.sem = asyncio.Semaphore(per_token)
+
+    def update_rate(self, headers, resource: str):
+        bucket = self.buckets.get(headers.get("X-RateLimit-Resource") or resource) or self.buckets[resource]
+        try:
+            if headers.get("X-RateLimit-Remaining") is not None:
+                bucket.remaining = int(headers["X-RateLimit-Remaining"])
+            if headers.get("X-RateLimit-Reset"):
+                bucket.reset_epoch = int(headers["X-RateLimit-Reset"])
+        except (TypeError, ValueError):
+            pass
+
+    def ready_at(self, now: float, resource: str) -> float:
+        # Token em quarentena (limite secundário) ou sem cota até o reset da janela primária, no recurso pedido.
+        bucket = self.buckets[resource]
+        at = bucket.ready_at(now)
+        if bucket.remaining is not None and bucket.remaining <= 0 and now < bucket.reset_epoch:
+            at = max(at, bucket.reset_epoch + 1)
+        return at
+
+
+class AsyncCrawler:
+    def __init__(self, tokens: list[str], concurrency: int = ASYNC_CONCURRENCY, per_token: int = ASYNC_PER_TOKEN):
+        self.pool = [AsyncTokenSession(t, per_token) for t in tokens]
+        self.idx = 0
+        self.concurrency = concurrency
+        self.global_sem = asyncio.Semaphore(concurrency)
+        self.http = None
+
+    async def __aenter__(self):
+        connect, read = TIMEOUT
+        self.http = aiohttp.ClientSession(
+            headers=DEFAULT_HEADERS,
+            timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read),
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.http.close()
+
+    def pick(self, resource: str = "core") -> AsyncTokenSession:
+        n = len(self.pool)
+        now = time.time()
+        for _ in range(n):
+            s = self.pool[self.idx]
+            self.idx = (self.idx + 1) % n
+            if s.ready_at(now, resource) <= now:
+                return s
+        return min(self.pool, key=lambda s: s.ready_at(now, resource))
+
+    async def safe_get(self, url: str, params: dict | None = None, attempts: int = 6, pacer=None, ttl=None):
+        cached = CACHE.get(url, params, ttl_for(url) if ttl is None else ttl)
+        if cached and _link_unknown(cached.get("link"), cached.get("json"), params):
+            cached = None
+        headers = _conditional_headers(cached)
+        if cached and cached.get("stale") is False and cached.get("json") is not None:
+            return cached["json"], cached.get("link")
+
+        resource = _resource_for(url)
+        for i in range(attempts):
+            if pacer is not None:
+                await asyncio.sleep(pacer.reserve())
+            sess = self.pick(resource)
+            # Só espera quando todos os tokens estão em quarentena, e fora dos semáforos, sem ocupar vagas.
+            wait = sess.ready_at(time.time(), resource) - time.time()
+            if wait > 0:
+                await asyncio.sleep(min(wait, 120))
+            try:
+                async with self.global_sem, sess.sem:
+                    async with self.http.get(url, params=params, headers={**sess.headers, **headers}) as r:
+                        sess.update_rate(r.headers, resource)
+                        status, resp_headers = r.status, r.headers
+                        text = await r.text() if status != 304 else ""
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                await asyncio.sleep(_backoff_seconds(i))
+                continue
+
+            if status == 304 and cached:
+                CACHE.revalidated(url, params)
+                return cached.get("json"), resp_headers.get("Link") or cached.get("link")
+
+            if _is_secondary_rate_limit(status, resp_headers, text):
+                retry_after = int(resp_headers.get("Retry-After", "0") or 0) or 60
+                sess.buckets[resource].blocked_until = time.time() + retry_after
+                continue
+            if _is_primary_rate_limit(status, resp_headers):
+                continue
+
+            delay = _retry_delay(status, resp_headers, text, i)
+            if delay is not None:
+                await asyncio.sleep(delay)
+                continue
+
+            if 200 <= status < 400:
+                try:
+                    payload = json.loads(text) if text else None
+                except ValueError:
+                    payload = None
+                _store_response(url, params, status, resp_headers, payload)
+                return payload, resp_headers.get("Link")
+
+            await asyncio.sleep(_backoff_seconds(i))
+
+        return None, None
+
+    async def safe_get_json(self, url: str, params: dict | None = None, attempts: int = 6, pacer=None, ttl=None):
+        return (await self.safe_get(url, params, attempts, pacer=pacer, ttl=ttl))[0]
+
+    async def _get_dicts(self, url: str, ttl=None) -> list:
+        # Mesma paginação de main.safe_get_all: página 1 informa o total, o resto sai em paralelo.
+        first, link = await self.safe_get(url, {"per_page": 100, "page": 1}, ttl=ttl)
+        pages = [first]
+        last = _last_page(link)
+        if first and last:
+            pages += await asyncio.gather(*(self.safe_get_json(url, {"per_page": 100, "page": pg}, ttl=ttl)
+                                            for pg in range(2, last + 1)))
+        items = []
+        for data in pages:
+            if not isinstance(data, list):
+                break
+            items.extend(x for x in data if isinstance(x, dict))
+        return items
+
+    async def fetch_single_pr(self, owner: str, repo: str, pr: dict):
+        duration_h = _pr_duration_hours(pr)
+        if duration_h is None or duration_h < MIN_ANALYSIS_HOURS:
+            return None
+
+        n = pr["number"]
+        ttl = _pr_ttl(pr)
+        reviews = await self._get_dicts(f"{BASE_URL}/repos/{owner}/{repo}/pulls/{n}/reviews", ttl)
+        if len(reviews) < 1:
+            return None
+
+        detail, issue_comments, review_comments, files = await asyncio.gather(
+            self.safe_get_json(f"{BASE_URL}/repos/{owner}/{repo}/pulls/{n}", ttl=ttl),
+            self._get_dicts(f"{BASE_URL}/repos/{owner}/{repo}/issues/{n}/comments", ttl),
+            self._get_dicts(f"{BASE_URL}/repos/{owner}/{repo}/pulls/{n}/comments", ttl),
+            self._get_dicts(f"{BASE_URL}/repos/{owner}/{repo}/pulls/{n}/files", ttl),
+        )
+        return build_pr_row(owner, repo, pr, duration_h, reviews, detail or {}, issue_comments, review_comments, files)
+
+    async def get_pull_requests(self, owner: str, repo: str, max_deep=MAX_DEEP_PRS_PER_REPO):
+        print(f"[início] {owner}/{repo} - limite: {max_deep} PRs", flush=True)
+        tasks = []
+        page = 1
+        while max_deep is None or len(tasks) < max_deep:
+            url = f"{BASE_URL}/repos/{owner}/{repo}/pulls"
+            data = await self.safe_get_json(url, params={"state": "closed", "per_page": 100, "page": page})
+            if not data or not isinstance(data, list):
+                break
+            candidates = prefilter_listed_prs(data)
+            if REVIEWS_PROBE == "graphql":
+                # A sondagem GraphQL é síncrona (TokenScheduler, cota graphql): roda numa thread à parte.
+                candidates = await asyncio.to_thread(drop_unreviewed_prs, owner, repo, candidates)
+            for pr in candidates:
+                if max_deep is not None and len(tasks) >= max_deep:
+                    print(f"[limite] {owner}/{repo} - atingiu {max_deep} PRs analisados", flush=True)
+                    break
+                tasks.append(asyncio.ensure_future(self.fetch_single_pr(owner, repo, pr)))
+            page += 1
+
+        results = [item for item in await asyncio.gather(*tasks) if item]
+        print(f"[fim] {owner}/{repo}: {len(results)} PRs coletados (válidos)", flush=True)
+        return results
+
+    async def iter_top_repositories_sorted(self, max_pages=10, per_page=100):
+        seen = set()
+        for page in range(1, max_pages + 1):
+            params = {"q": "stars:>1", "sort": "stars", "order": "desc", "per_page": per_page, "page": page}
+            data = await self.safe_get_json(f"{BASE_URL}/search/repositories", params=params, pacer=SEARCH_PACER)
+            items = (data or {}).get("items") or []
+            if not items:
+                break
+            for r in items:
+                key = f"{r['owner']['login']}/{r['name']}"
+                if key in seen:
+                    continue
+                seen.add(key)
+                yield r
+
+    async def get_closed_prs_count(self, owner: str, repo: str) -> int:
+        params = {"q": f"repo:{owner}/{repo} is:pr is:closed", "per_page": 1}
+        data = await self.safe_get_json(f"{BASE_URL}/search/issues", params=params, pacer=SEARCH_PACER)
+        if not data:
+            return 0
+        return int(data.get("total_count", 0))
+
+    async def get_closed_prs_count_link(self, owner: str, repo: str) -> int:
+        # Mesma conta de main.get_closed_prs_count_link: com per_page=1, rel="last" é o total de PRs fechados.
+        data, link = await self.safe_get(f"{BASE_URL}/repos/{owner}/{repo}/pulls", {"state": "closed", "per_page": 1})
+        last = _last_page(link)
+        if last is not None:
+            return last
+        return len(data) if isinstance(data, list) else 0
+
+    async def count_closed_prs(self, repos: list[tuple[str, str]], strategy: str = ELIGIBILITY_STRATEGY) -> list[int]:
+        # Mesmas estratégias de main.count_closed_prs (ELIGIBILITY_STRATEGY).
+        if strategy == "graphql":
+            from graphql_collector import closed_pr_counts
+            counts = await asyncio.to_thread(closed_pr_counts, repos)
+            return [counts.get(f"{owner}/{name}", 0) for owner, name in repos]
+        count = self.get_closed_prs_count_link if strategy == "link" else self.get_closed_prs_count
+        return list(await asyncio.gather(*(count(owner, name) for owner, name in repos)))
+
+    async def _eligibility_batch(self, batch: list[dict]) -> list[dict]:
+        counts = await self.count_closed_prs([(r["owner"]["login"], r["name"]) for r in batch])
+        items = [eligibility_item(r, total_closed) for r, total_closed in zip(batch, counts)]
+        for item in items:
+            print(f"[eligibility] {item['key']} -> closed PRs={item['total_closed_prs']}", flush=True)
+        return items
+
+    async def crawl(self, sink, target: int):
+        print(f"Buscando repositórios por estrelas até completar {target} elegíveis...", flush=True)
+        candidates = [r async for r in self.iter_top_repositories_sorted(max_pages=10)]
+        print(f"[eligibility] Candidatos recebidos da Search API: {len(candidates)}", flush=True)
+
+        batch_size = ELIGIBILITY_BATCH if ELIGIBILITY_STRATEGY == "graphql" else 1
+        batches = await asyncio.gather(*(self._eligibility_batch(b) for b in _batched(candidates, batch_size)))
+        eligible = [it for items in batches for it in items if it["total_closed_prs"] >= MIN_CLOSED_PRS][:target]
+
+        print(f"[main] Elegíveis reunidos: {len(eligible)} (alvo={target})", flush=True)
+        if len(eligible) < target:
+            print(f"[main] AVISO: não foi possível atingir {target} dentro do limite da Search API. Aumente max_pages.", flush=True)
+
+        repo_sem = asyncio.Semaphore(ASYNC_REPO_CONCURRENCY)
+
+        async def _collect_repo(item):
+            async with repo_sem:
+                prs = await self.get_pull_requests(item["owner"], item["repo"])
+            return annotate_repo_rows(prs, item)
+
+        for fut in asyncio.as_completed([_collect_repo(it) for it in eligible]):
+            sink.write(await fut)
+        return eligible
+
+
+async def _run(sink, target: int):
+    async with AsyncCrawler(TOKENS) as crawler:
+        return await crawler.crawl(sink, target)
+
+
+def run(sink, target: int):
+    return asyncio.run(_run(sink, target))
@@ -0,0 +1,106 @@
+import os
+import re
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from mock_github import add_mock_arguments, config_from_args, start_in_thread
+
+# Roda o pipeline completo de main.py (subprocesso, como em produção) contra o mock_github e mede
+# throughput, tempo total, taxa de acerto do cache e pico de memória. As execuções seguintes reaproveitam
+# o cache da primeira, para comparar coleta fria e morna.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_LINE = re.compile(r"\[cache\] hits=(\d+) \| 304=(\d+) \| misses=(\d+) \| stale=(\d+)")
+END_LINE = re.compile(r"\[end\] .*PRs=(\d+)")
+
+
+def crawl_env(api_url: str, workdir: str, args) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "GITHUB_API_URL": api_url,
+        "GITHUB_TOKENS": ",".join(f"mock-token-{i}" for i in range(args.tokens)),
+        "CACHE_DB_PATH": os.path.join(workdir, "cache", "github_api_cache.sqlite"),
+        "OUTPUT_FILENAME": os.path.join(workdir, "dataset.csv"),
+        "ELIGIBILITY_TARGET": str(args.target),
+        "MIN_CLOSED_PRS": str(args.min_closed),
+        "MAX_DEEP_PRS_PER_REPO": str(args.max_deep),
+        # O pacing da Search API é local; contra o mock ele só mediria o sleep.
+        "SEARCH_REQUESTS_PER_MINUTE": str(args.search_rpm),
+        "PYTHONUNBUFFERED": "1",
+    })
+    return env
+
+
+def run_crawl(extra_args: list[str], env: dict, log_path: str) -> dict:
+    cmd = [sys.executable, os.path.join(HERE, "main.py"), *extra_args]
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.Popen(cmd, cwd=HERE, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 devolve o rusage só deste filho (ru_maxrss em KB no Linux).
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.perf_counter() - start
+
+    with open(log_path, encoding="utf-8") as f:
+        output = f.read()
+    cache = CACHE_LINE.search(output)
+    end = END_LINE.search(output)
+    hits, not_modified, misses, stale = (int(x) for x in cache.groups()) if cache else (0, 0, 0, 0)
+    return {
+        "exit": proc.returncode,
+        "wall": elapsed,
+        "rss_mb": usage.ru_maxrss / 1024,
+        "rows": int(end.group(1)) if end else 0,
+        "hits": hits,
+        "not_modified": not_modified,
+        "misses": misses,
+        "stale": stale,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta do crawler contra a API simulada.")
+    add_mock_arguments(parser)
+    parser.add_argument("--runs", type=int, default=2, help="execuções; a partir da 2ª o cache já está quente")
+    parser.add_argument("--tokens", type=int, default=2)
+    parser.add_argument("--target", type=int, default=5, help="ELIGIBILITY_TARGET da coleta")
+    parser.add_argument("--min-closed", type=int, default=100, help="MIN_CLOSED_PRS da coleta")
+    parser.add_argument("--max-deep", type=int, default=120, help="MAX_DEEP_PRS_PER_REPO da coleta")
+    parser.add_argument("--search-rpm", type=float, default=6000)
+    parser.add_argument("--keep", action="store_true", help="mantém o diretório temporário (cache, dataset e logs)")
+    parser.add_argument("crawl_args", nargs=argparse.REMAINDER,
+                        help="argumentos repassados a main.py após '--' (ex.: -- --engine=async)")
+    args = parser.parse_args()
+    crawl_args = [a for a in args.crawl_args if a != "--"]
+
+    server = start_in_thread(config_from_args(args))
+    workdir = tempfile.mkdtemp(prefix="bench_crawl_")
+    env = crawl_env(server.base_url, workdir, args)
+    print(f"[bench] mock em {server.base_url} | {args.repos} repos x ~{args.prs} PRs | latência "
+          f"{args.latency * 1000:.0f} ms | secundário {args.secondary_rate:.1%} | 5xx {args.error_rate:.1%} | "
+          f"main.py {' '.join(crawl_args) or '(padrão)'}", flush=True)
+
+    failed = False
+    try:
+        for i in range(1, args.runs + 1):
+            server.reset_stats()
+            res = run_crawl(crawl_args, env, os.path.join(workdir, f"run{i}.log"))
+            st = server.stats()
+            lookups = res["hits"] + res["stale"] + res["misses"]
+            status = " ".join(f"{code}={n}" for code, n in sorted(st["status"].items()))
+            print(f"[bench] run {i} ({'frio' if i == 1 else 'morno'}) | {res['wall']:7.2f} s | "
+                  f"{st['requests'] / res['wall']:7.1f} req/s | requisições={st['requests']} ({status or '-'}) | "
+                  f"cache hit={100 * res['hits'] / max(1, lookups):5.1f}% 304={res['not_modified']} | "
+                  f"PRs={res['rows']} | pico RSS={res['rss_mb']:.0f} MB | exit={res['exit']}", flush=True)
+            failed = failed or res["exit"] != 0
+    finally:
+        server.shutdown()
+        if args.keep or failed:
+            print(f"[bench] artefatos em {workdir}", flush=True)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,149 @@
+import gzip
+import json
+import time
+import argparse
+import multiprocessing as mp
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from main import DEFAULT_HEADERS, HTTPX_AVAILABLE, make_http_session
+
+# Resposta parecida com uma página de /pulls/{n}/reviews: JSON repetitivo, que comprime bem.
+PAYLOAD = json.dumps([
+    {"id": i, "user": {"login": f"user{i % 7}", "type": "User"}, "state": "APPROVED",
+     "body": "LGTM " * 20, "submitted_at": "2024-01-01T00:00:00Z"}
+    for i in range(30)
+]).encode()
+PAYLOAD_GZIP = gzip.compress(PAYLOAD)
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    # Roda em outro processo para não disputar o GIL com o cliente medido; os contadores são compartilhados.
+    def __init__(self, latency: float, handshake: float, connections, bytes_sent, port: int = 0):
+        super().__init__(("127.0.0.1", port), MockHandler)
+        self.latency = latency
+        self.handshake = handshake
+        self.connections = connections
+        self.bytes_sent = bytes_sent
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Cabeçalho e corpo saem em writes separados; com Nagle ligado cada resposta esperaria o ACK atrasado (~40 ms).
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.connections.get_lock():
+            self.server.connections.value += 1
+        # Sem TLS local, o custo de abrir conexão é simulado (o handshake real com api.github.com fica em dezenas de ms).
+        time.sleep(self.server.handshake)
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        gzipped = "gzip" in (self.headers.get("Accept-Encoding") or "")
+        body = PAYLOAD_GZIP if gzipped else PAYLOAD
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.bytes_sent.get_lock():
+            self.server.bytes_sent.value += len(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MockProcess:
+    def __init__(self, latency: float, handshake: float):
+        self.connections = mp.Value("q", 0)
+        self.bytes_sent = mp.Value("q", 0)
+        ready = mp.Queue()
+        self.proc = mp.Process(target=self._serve, args=(latency, handshake, ready), daemon=True)
+        self.proc.start()
+        self.port = ready.get(timeout=10)
+
+    def _serve(self, latency, handshake, ready):
+        server = MockServer(latency, handshake, self.connections, self.bytes_sent)
+        ready.put(server.server_address[1])
+        server.serve_forever()
+
+    def reset(self):
+        self.connections.value = 0
+        self.bytes_sent.value = 0
+
+    def stop(self):
+        self.proc.terminate()
+        self.proc.join()
+
+
+def _plain_session(accept_encoding: str):
+    # Como TokenSession era antes: requests.Session com o adapter padrão (10 conexões por host).
+    session = requests.Session()
+    session.headers["Accept-Encoding"] = accept_encoding
+    return session
+
+
+def configurations(threads: int) -> list[tuple[str, callable]]:
+    configs = [
+        ("requests pool=10 sem compressão", lambda: _plain_session("identity")),
+        ("requests pool=10 gzip", lambda: _plain_session("gzip")),
+        (f"requests pool={threads} gzip", lambda: make_http_session(threads, backend="requests")),
+    ]
+    if HTTPX_AVAILABLE:
+        configs.append((f"httpx pool={threads}", lambda: make_http_session(threads, backend="httpx")))
+    return configs
+
+
+def run_config(server: MockProcess, make_session, url: str, threads: int, total: int) -> dict:
+    session = make_session()
+    session.headers.update(DEFAULT_HEADERS)
+    # Aquece uma conexão para não medir o primeiro handshake de cada configuração.
+    session.request("GET", url)
+    server.reset()
+
+    def _one(_):
+        r = session.request("GET", url, timeout=(10, 45))
+        r.json()
+        return r.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        statuses = list(ex.map(_one, range(total)))
+    elapsed = time.perf_counter() - start
+    session.close()
+    return {
+        "req_s": total / elapsed,
+        "connections": server.connections.value,
+        "kb": server.bytes_sent.value / 1024,
+        "errors": sum(1 for st in statuses if st != 200),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark do transporte HTTP contra um servidor local.")
+    parser.add_argument("--threads", type=int, default=32, help="threads disputando a mesma sessão (um token)")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--latency", type=float, default=0.005, help="latência simulada por resposta (s)")
+    parser.add_argument("--handshake", type=float, default=0.03, help="custo simulado de cada conexão nova (s)")
+    args = parser.parse_args()
+
+    server = MockProcess(args.latency, args.handshake)
+    url = f"http://127.0.0.1:{server.port}/repos/o/r/pulls/1/reviews"
+    print(f"[bench] {args.requests} requisições, {args.threads} threads, latência {args.latency * 1000:.0f} ms, "
+          f"handshake {args.handshake * 1000:.0f} ms", flush=True)
+
+    for name, make_session in configurations(args.threads):
+        res = run_config(server, make_session, url, args.threads, args.requests)
+        print(f"[bench] {name:<34} {res['req_s']:8.0f} req/s | conexões novas: {res['connections']:5d} | "
+              f"{res['kb']:8.0f} KB transferidos | erros: {res['errors']}", flush=True)
+
+    server.stop()
@@ -0,0 +1,192 @@
+import os
+import re
+import json
+import argparse
+
+from main import MAX_DEEP_PRS_PER_REPO, MIN_ANALYSIS_HOURS, _pr_duration_hours, safe_post_graphql
+
+GRAPHQL_PAGE_SIZE = int(os.getenv("GRAPHQL_PAGE_SIZE", "50"))
+PROBE_BATCH_SIZE = int(os.getenv("PROBE_BATCH_SIZE", "100"))
+
+PULLS_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(states: [CLOSED, MERGED], first: $first, after: $after,
+                 orderBy: {field: CREATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        number
+        createdAt
+        closedAt
+        mergedAt
+        body
+        author { login }
+        additions
+        deletions
+        changedFiles
+        comments { totalCount }
+        participants { totalCount }
+        reviews(first: 100) {
+          totalCount
+          nodes { comments { totalCount } }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+# Substitui safe_post_graphql lendo respostas gravadas em disco, uma por página:
+# <dir>/<owner>__<name>__<cursor|first>.json, no mesmo formato da API ({"data": ...}).
+class FixturePoster:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path_for(self, variables: dict) -> str:
+        cursor = re.sub(r"[^A-Za-z0-9_-]", "_", variables.get("after") or "first")
+        return os.path.join(self.directory, f"{variables['owner']}__{variables['name']}__{cursor}.json")
+
+    def __call__(self, query: str, variables: dict | None = None):
+        path = self.path_for(variables or {})
+        if not os.path.exists(path):
+            print(f"[graphql] fixture ausente: {path}", flush=True)
+            return None
+        with open(path, encoding="utf-8") as fh:
+            return (json.load(fh) or {}).get("data")
+
+
+def _probe_query(numbers: list[int]) -> str:
+    fields = "\n".join(f"    pr{n}: pullRequest(number: {n}) {{ reviews {{ totalCount }} }}" for n in numbers)
+    return (
+        "query($owner: String!, $name: String!) {\n"
+        "  repository(owner: $owner, name: $name) {\n"
+        f"{fields}\n"
+        "  }\n"
+        "}\n"
+    )
+
+
+def probe_review_counts(owner: str, repo: str, numbers: list[int], batch_size: int = PROBE_BATCH_SIZE,
+                        post=None) -> dict[int, int]:
+    post = post or safe_post_graphql
+    counts = {}
+    for i in range(0, len(numbers), batch_size):
+        batch = [int(n) for n in numbers[i:i + batch_size]]
+        data = post(_probe_query(batch), {"owner": owner, "name": repo})
+        repository = (data or {}).get("repository") or {}
+        for n in batch:
+            node = repository.get(f"pr{n}")
+            if node is not None:
+                counts[n] = int((node.get("reviews") or {}).get("totalCount") or 0)
+    return counts
+
+
+def closed_pr_counts(repos: list[tuple[str, str]], post=None) -> dict[str, int]:
+    post = post or safe_post_graphql
+    fields = "\n".join(
+        f"  r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{\n"
+        f"    pullRequests(states: [CLOSED, MERGED]) {{ totalCount }}\n"
+        f"  }}"
+        for i, (owner, name) in enumerate(repos)
+    )
+    data = post(f"query {{\n{fields}\n}}\n", {}) or {}
+    counts = {}
+    for i, (owner, name) in enumerate(repos):
+        node = data.get(f"r{i}")
+        if node:
+            counts[f"{owner}/{name}"] = int((node.get("pullRequests") or {}).get("totalCount") or 0)
+    return counts
+
+
+def iter_pull_request_nodes(owner: str, repo: str, page_size: int = GRAPHQL_PAGE_SIZE, post=None):
+    post = post or safe_post_graphql
+    after = None
+    while True:
+        data = post(PULLS_QUERY, {"owner": owner, "name": repo, "first": page_size, "after": after})
+        conn = ((data or {}).get("repository") or {}).get("pullRequests") or {}
+        for node in conn.get("nodes") or []:
+            if node:
+                yield node
+        page_info = conn.get("pageInfo") or {}
+        if not page_info.get("hasNextPage") or not page_info.get("endCursor"):
+            break
+        after = page_info["endCursor"]
+
+
+def node_to_row(owner: str, repo: str, node: dict):
+    pr = {
+        "number": node["number"],
+        "created_at": node.get("createdAt"),
+        "closed_at": node.get("closedAt"),
+        "merged_at": node.get("mergedAt"),
+    }
+    duration_h = _pr_duration_hours(pr)
+    if duration_h is None or duration_h < MIN_ANALYSIS_HOURS:
+        return None
+
+    reviews = node.get("reviews") or {}
+    reviews_count = int(reviews.get("totalCount") or 0)
+    if reviews_count < 1:
+        return None
+
+    review_comments = sum(int(((rv or {}).get("comments") or {}).get("totalCount") or 0)
+                          for rv in reviews.get("nodes") or [])
+
+    return {
+        "owner": owner,
+        "repo_name": repo,
+        "repo": f"{owner}/{repo}",
+        "pr_number": node["number"],
+        "state": "merged" if node.get("mergedAt") else "closed",
+        "num_files": int(node.get("changedFiles") or 0),
+        "additions": int(node.get("additions") or 0),
+        "deletions": int(node.get("deletions") or 0),
+        "analysis_time_hours": duration_h,
+        "description_length": len(node.get("body") or ""),
+        "participants_count": int((node.get("participants") or {}).get("totalCount") or 0),
+        "comments_count": int((node.get("comments") or {}).get("totalCount") or 0) + review_comments,
+        "reviews_count": reviews_count,
+    }
+
+
+def get_pull_requests_graphql(owner, repo, max_deep=MAX_DEEP_PRS_PER_REPO, page_size: int = GRAPHQL_PAGE_SIZE,
+                              post=None):
+    print(f"[início] {owner}/{repo} - limite: {max_deep} PRs (graphql)", flush=True)
+    results = []
+    deep_analyzed = 0
+    for node in iter_pull_request_nodes(owner, repo, page_size=page_size, post=post):
+        if max_deep is not None and deep_analyzed >= max_deep:
+            print(f"[limite] {owner}/{repo} - atingiu {max_deep} PRs analisados", flush=True)
+            break
+        row = node_to_row(owner, repo, node)
+        if row:
+            deep_analyzed += 1
+            results.append(row)
+
+    print(f"[fim] {owner}/{repo}: {len(results)} PRs coletados (válidos)", flush=True)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Coleta os PRs de um repositório via GraphQL.")
+    parser.add_argument("repo", help="owner/nome")
+    parser.add_argument("--fixtures", help="diretório com respostas gravadas (modo offline)")
+    parser.add_argument("--page-size", type=int, default=GRAPHQL_PAGE_SIZE)
+    parser.add_argument("--max-deep", type=int, default=MAX_DEEP_PRS_PER_REPO)
+    parser.add_argument("--expected", help="JSONL com as linhas esperadas; sai com código 1 se divergir")
+    args = parser.parse_args()
+
+    owner, name = args.repo.split("/", 1)
+    poster = FixturePoster(args.fixtures) if args.fixtures else None
+    rows = get_pull_requests_graphql(owner, name, max_deep=args.max_deep, page_size=args.page_size, post=poster)
+    for row in rows:
+        print(json.dumps(row, ensure_ascii=False))
+
+    if args.expected:
+        with open(args.expected, encoding="utf-8") as fh:
+            expected = [json.loads(line) for line in fh if line.strip()]
+        if rows != expected:
+            print(f"[graphql] FALHA: {len(rows)} linhas obtidas, {len(expected)} esperadas em {args.expected}", flush=True)
+            raise SystemExit(1)
+        print(f"[graphql] OK: {len(rows)} linhas conferem com {args.expected}", flush=True)
@@ -1,31 +1,48 @@
 import os
+import sys
 import time
+import atexit
+import re
 import json
+import argparse
 import math
 import hashlib
 import random
 import sqlite3
+import itertools
 import threading
+import bisect
+import heapq
+import contextvars
+from collections import deque
 from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from datetime import datetime, timezone
 
-import requests
-import pandas as pd
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import zlib
+from importlib.util import find_spec
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# requests, pandas e httpx são importados só quando usados (make_http_session, DatasetWriter): quem importa
+# main como biblioteca (async_engine, rebuild, testes) não paga por eles. find_spec só consulta o disco.
+HTTPX_AVAILABLE = find_spec("httpx") is not None
+HTTP2_AVAILABLE = find_spec("h2") is not None  # só habilita HTTP/2 no httpx
 
 OUTPUT_FILENAME = os.getenv("OUTPUT_FILENAME", "dataset.csv")
-BASE_URL = "https://api.github.com"
+DATASET_CHUNK_ROWS = int(os.getenv("DATASET_CHUNK_ROWS", "5000"))
+GROUPED_STATS_OUTPUT = os.getenv("GROUPED_STATS_OUTPUT", "")
+BASE_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+GRAPHQL_URL = f"{BASE_URL}/graphql"
 
 
 TOKENS_ENV = os.getenv("GITHUB_TOKENS", "").strip()
 SINGLE_TOKEN = os.getenv("GITHUB_TOKEN", "").strip()
 TOKENS = [t.strip() for t in TOKENS_ENV.split(",") if t.strip()] or ([SINGLE_TOKEN] if SINGLE_TOKEN else [])
-TOKENS = [
-    ]
-if not TOKENS:
-    raise RuntimeError(
-        "Nenhum token encontrado. Defina GITHUB_TOKENS (comma-separated) ou GITHUB_TOKEN no ambiente."
-    )
 
 DEFAULT_HEADERS = {
     "Accept": "application/vnd.github+json",
@@ -36,10 +53,38 @@ DEFAULT_HEADERS = {
 TIMEOUT = (10, 45)
 MAX_DEEP_PRS_PER_REPO = int(os.getenv("MAX_DEEP_PRS_PER_REPO", "3000"))
 MAX_WORKERS = int(os.getenv("MAX_WORKERS", "16"))
+REPO_WORKERS = int(os.getenv("REPO_WORKERS", "12"))
+PAGE_WORKERS = int(os.getenv("PAGE_WORKERS", "8"))
+PAGE_PREFETCH = int(os.getenv("PAGE_PREFETCH", "4"))
+PR_QUEUE_DEPTH = int(os.getenv("PR_QUEUE_DEPTH", str(MAX_WORKERS * 2)))
+PR_RETRIES = int(os.getenv("PR_RETRIES", "2"))
+PR_MAX_DEFERRALS = int(os.getenv("PR_MAX_DEFERRALS", "8"))
+RETRY_INLINE_MAX = float(os.getenv("RETRY_INLINE_MAX", "1"))
+TOKEN_MAX_IN_FLIGHT = int(os.getenv("TOKEN_MAX_IN_FLIGHT", "8"))
+HTTP_BACKEND = os.getenv("HTTP_BACKEND", "requests").strip().lower()
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "0"))
+SEARCH_REQUESTS_PER_MINUTE = float(os.getenv("SEARCH_REQUESTS_PER_MINUTE", "30"))
+SEARCH_BURST = float(os.getenv("SEARCH_BURST", "5"))
+ELIGIBILITY_STRATEGY = os.getenv("ELIGIBILITY_STRATEGY", "search").strip().lower()
+ELIGIBILITY_BATCH = int(os.getenv("ELIGIBILITY_BATCH", "50"))
+ELIGIBILITY_WINDOW = int(os.getenv("ELIGIBILITY_WINDOW", "32"))
+MIN_ANALYSIS_HOURS = 1.0
+REVIEWS_PROBE = os.getenv("REVIEWS_PROBE", "none").strip().lower()
 
 CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", ".cache/github_api_cache.sqlite")
 CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "86400"))
-os.makedirs(os.path.dirname(CACHE_DB_PATH), exist_ok=True)
+CACHE_FLUSH_INTERVAL = float(os.getenv("CACHE_FLUSH_INTERVAL", "0.5"))
+CACHE_BATCH_SIZE = int(os.getenv("CACHE_BATCH_SIZE", "500"))
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "zstd" if zstandard else "zlib").strip().lower()
+CACHE_PROJECTION = os.getenv("CACHE_PROJECTION", "0") == "1"
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", "0"))
+SEARCH_TTL_SECONDS = int(os.getenv("SEARCH_TTL_SECONDS", "3600"))
+IMMUTABLE_AFTER_DAYS = float(os.getenv("IMMUTABLE_AFTER_DAYS", "7"))
+TTL_FOREVER = -1
+CACHE_MAINTENANCE_INTERVAL = int(os.getenv("CACHE_MAINTENANCE_INTERVAL", "300"))
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "0"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", os.path.join(os.path.dirname(CACHE_DB_PATH), "crawl_checkpoint.sqlite"))
 
 def _now_ts() -> int:
     return int(time.time())
@@ -56,15 +101,273 @@ def _params_fingerprint(params: dict | None) -> str:
 def _cache_key(url: str, params: dict | None) -> str:
     return hashlib.sha256(f"{url}|{_params_fingerprint(params)}".encode("utf-8")).hexdigest()
 
+def _endpoint_of(url: str) -> str:
+    path = url.split("?", 1)[0]
+    if path.startswith(BASE_URL):
+        path = path[len(BASE_URL):]
+    path = re.sub(r"^/repos/[^/]+/[^/]+", "/repos/{owner}/{repo}", path)
+    return re.sub(r"/\d+(?=/|$)", "/{n}", path) or "/"
+
+class Lazy:
+    # Singleton criado no primeiro acesso a um atributo: importar main não abre o SQLite do cache nem monta
+    # as sessões HTTP dos tokens. Quem usa (CACHE.get, SCHEDULER.request) não percebe a diferença.
+    def __init__(self, factory):
+        self._lazy_factory = factory
+        self._lazy_obj = None
+        self._lazy_lock = threading.Lock()
+
+    def _lazy_resolve(self):
+        obj = self._lazy_obj
+        if obj is None:
+            with self._lazy_lock:
+                if self._lazy_obj is None:
+                    self._lazy_obj = self._lazy_factory()
+                obj = self._lazy_obj
+        return obj
+
+    @property
+    def initialized(self) -> bool:
+        return self._lazy_obj is not None
+
+    def __getattr__(self, name):
+        return getattr(self._lazy_resolve(), name)
+
+CACHE_OUTCOMES = ("hits", "stale", "misses", "not_modified", "stores")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+class Metrics:
+    # Contadores e histogramas de latência por (etapa, endpoint, resultado). Cada registro é um bisect e
+    # um incremento sob lock, barato o bastante para o caminho quente (cache, tokens, HTTP).
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.started = time.monotonic()
+        self._counters = {}
+        self._hist = {}
+        self._lock = threading.Lock()
+
+    def inc(self, stage: str, endpoint: str = "", outcome: str = "", n: int = 1):
+        key = (stage, endpoint, outcome)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def observe(self, stage: str, seconds: float, endpoint: str = "", outcome: str = ""):
+        key = (stage, endpoint, outcome)
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            h = self._hist.get(key)
+            if h is None:
+                # Uma posição por bucket, mais +Inf, mais a soma dos segundos.
+                h = self._hist[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            h[i] += 1
+            h[-1] += seconds
+
+    @contextmanager
+    def timer(self, stage: str, endpoint: str = "", outcome: str = ""):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0, endpoint, outcome)
+
+    def _quantile(self, counts: list[int], q: float) -> float:
+        total = sum(counts)
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= q * total:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return 0.0
+
+    def summary(self) -> dict:
+        # Agregado por etapa para a linha de log periódica; o detalhe por endpoint fica no /metrics.
+        with self._lock:
+            counters = dict(self._counters)
+            hist = {k: list(v) for k, v in self._hist.items()}
+        events = {}
+        for (stage, _, outcome), n in counters.items():
+            events.setdefault(stage, {})
+            events[stage][outcome or "total"] = events[stage].get(outcome or "total", 0) + n
+        latency = {}
+        for (stage, _, _), h in hist.items():
+            agg = latency.setdefault(stage, [0] * (len(h) - 1) + [0.0])
+            for i, v in enumerate(h):
+                agg[i] += v
+        return {
+            "uptime_s": round(time.monotonic() - self.started, 1),
+            "events": events,
+            "latency": {stage: {"count": sum(h[:-1]), "sum_s": round(h[-1], 3),
+                                "p50_le": self._quantile(h[:-1], 0.5), "p95_le": self._quantile(h[:-1], 0.95)}
+                        for stage, h in latency.items()},
+        }
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            counters = sorted(self._counters.items())
+            hist = sorted((k, list(v)) for k, v in self._hist.items())
+        lines = ["# TYPE crawler_events_total counter"]
+        for (stage, endpoint, outcome), n in counters:
+            lines.append(f'crawler_events_total{{stage="{stage}",endpoint="{endpoint}",outcome="{outcome}"}} {n}')
+        lines.append("# TYPE crawler_latency_seconds histogram")
+        for (stage, endpoint, outcome), h in hist:
+            labels = f'stage="{stage}",endpoint="{endpoint}",outcome="{outcome}"'
+            cumulative = 0
+            for le, c in zip([*self.buckets, "+Inf"], h[:-1]):
+                cumulative += c
+                lines.append(f'crawler_latency_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"crawler_latency_seconds_sum{{{labels}}} {h[-1]:.6f}")
+            lines.append(f"crawler_latency_seconds_count{{{labels}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = METRICS.render_prometheus().encode("utf-8")
+        self.send_response(200 if self.path.split("?", 1)[0] in ("/", "/metrics") else 404)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def serve_metrics(port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"[metrics] formato Prometheus em http://127.0.0.1:{server.server_address[1]}/metrics", flush=True)
+    return server
+
+def start_metrics_reporter(interval: float) -> threading.Event:
+    stop = threading.Event()
+
+    def _loop():
+        while not stop.wait(interval):
+            print(f"[metrics] {json.dumps(METRICS.summary(), separators=(',', ':'))}", flush=True)
+
+    threading.Thread(target=_loop, name="metrics-reporter", daemon=True).start()
+    return stop
+
+# Primeira regra que casar com o caminho vence; sem regra, vale CACHE_TTL_SECONDS.
+CACHE_TTL_POLICY = [
+    (re.compile(r"^/search/"), SEARCH_TTL_SECONDS),
+]
+
+def ttl_for(url: str) -> int:
+    path = url.split("?", 1)[0]
+    if path.startswith(BASE_URL):
+        path = path[len(BASE_URL):]
+    for pattern, ttl in CACHE_TTL_POLICY:
+        if pattern.search(path):
+            return ttl
+    return CACHE_TTL_SECONDS
+
+def _pr_ttl(pr: dict) -> int | None:
+    # Reviews, comentários e arquivos de um PR fechado há mais de IMMUTABLE_AFTER_DAYS praticamente não mudam.
+    end_raw = pr.get("merged_at") or pr.get("closed_at")
+    if not end_raw:
+        return None
+    age_days = (_now_ts() - _iso_to_dt(end_raw).timestamp()) / 86400.0
+    return TTL_FOREVER if age_days >= IMMUTABLE_AFTER_DAYS else None
+
+# Campos que o coletor realmente lê de cada endpoint; com CACHE_PROJECTION=1 só eles vão para o cache.
+CACHE_PROJECTIONS = [
+    (re.compile(r"/search/repositories$"), ["total_count", "items.owner.login", "items.name", "items.full_name",
+                                            "items.stargazers_count", "items.html_url"]),
+    (re.compile(r"/search/issues$"), ["total_count"]),
+    (re.compile(r"/repos/[^/]+/[^/]+/pulls$"), ["number", "state", "created_at", "updated_at", "closed_at",
+                                               "merged_at", "body", "user.login"]),
+    (re.compile(r"/repos/[^/]+/[^/]+/pulls/\d+$"), ["number", "state", "created_at", "closed_at", "merged_at", "body",
+                                                    "user.login", "comments", "review_comments", "additions",
+                                                    "deletions", "changed_files"]),
+    (re.compile(r"/repos/[^/]+/[^/]+/pulls/\d+/reviews$"), ["id", "state", "submitted_at", "user.login"]),
+    (re.compile(r"/repos/[^/]+/[^/]+/(issues|pulls)/\d+/comments$"), ["id", "created_at", "user.login"]),
+    (re.compile(r"/repos/[^/]+/[^/]+/pulls/\d+/files$"), ["filename", "status", "additions", "deletions", "changes"]),
+]
+
+def _project(obj, paths: list[list[str]]):
+    if isinstance(obj, list):
+        return [_project(x, paths) for x in obj]
+    if not isinstance(obj, dict):
+        return obj
+    out = {}
+    for head in dict.fromkeys(p[0] for p in paths):
+        if head not in obj:
+            continue
+        rest = [p[1:] for p in paths if p[0] == head and len(p) > 1]
+        out[head] = _project(obj[head], rest) if rest and obj[head] is not None else obj[head]
+    return out
+
+def project_payload(url: str, payload):
+    for pattern, fields in CACHE_PROJECTIONS:
+        if pattern.search(url.split("?", 1)[0]):
+            return _project(payload, [f.split(".") for f in fields])
+    return payload
+
+def _encode_payload(payload, compression: str) -> tuple[str, bytes | None]:
+    if payload is None:
+        return compression, None
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    if compression == "zstd" and zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=3).compress(raw)
+    if compression in ("zlib", "zstd"):
+        return "zlib", zlib.compress(raw, 6)
+    return "json", raw
+
+class CacheCodecError(RuntimeError):
+    # Entrada gravada com um codec que este ambiente não tem (ex.: zstd sem o pacote zstandard).
+    pass
+
+def _decode_payload(encoding: str | None, blob: bytes | None, response_json: str | None):
+    if blob is None:
+        return json.loads(response_json) if response_json else None
+    if encoding == "zstd":
+        if zstandard is None:
+            raise CacheCodecError("entrada do cache comprimida com zstd, mas o pacote zstandard não está instalado "
+                                  "(pip install zstandard)")
+        blob = zstandard.ZstdDecompressor().decompress(blob)
+    elif encoding == "zlib":
+        blob = zlib.decompress(blob)
+    return json.loads(blob)
+
 class SQLiteCache:
-    def __init__(self, path: str, ttl_seconds: int):
+    def __init__(self, path: str, ttl_seconds: int, flush_interval: float = CACHE_FLUSH_INTERVAL,
+                 batch_size: int = CACHE_BATCH_SIZE, compression: str = CACHE_COMPRESSION,
+                 projection: bool = CACHE_PROJECTION):
         self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
         self.ttl = ttl_seconds
-        self._lock = threading.RLock()
+        self.compression = compression
+        self._codec_warned = False
+        self.projection = projection
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self._pending = {}
+        self._inflight = {}
+        self._touched = {}
+        self._revalidated = {}
+        self._stats = {}
+        self.run_totals = dict.fromkeys(CACHE_OUTCOMES + ("ttl_saved",), 0)
+        self._last_maintenance = time.monotonic()
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
         self._ensure_schema()
+        self._writer = threading.Thread(target=self._writer_loop, name="sqlite-cache-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
 
     def _ensure_schema(self):
-        with self._conn() as con:
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            # Só tem efeito em banco novo; bancos antigos passam a INCREMENTAL no primeiro maintain(full=True).
+            con.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+            con.execute("PRAGMA journal_mode=WAL;")
             con.execute("""
               CREATE TABLE IF NOT EXISTS cache (
                 cache_key TEXT PRIMARY KEY,
@@ -77,144 +380,822 @@ class SQLiteCache:
                 created_at INTEGER NOT NULL
               )
             """)
-            con.execute("PRAGMA journal_mode=WAL;")
-            con.execute("PRAGMA synchronous=NORMAL;")
-
-    @contextmanager
-    def _conn(self):
-        con = sqlite3.connect(self.path, timeout=30)
-        try:
-            yield con
+            columns = {r[1] for r in con.execute("PRAGMA table_info(cache)")}
+            for name, decl in (("link_header", "TEXT"), ("encoding", "TEXT"), ("response_blob", "BLOB"),
+                               ("last_access", "INTEGER")):
+                if name not in columns:
+                    con.execute(f"ALTER TABLE cache ADD COLUMN {name} {decl}")
+            if "last_access" not in columns:
+                con.execute("UPDATE cache SET last_access=created_at")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_cache_created_at ON cache(created_at)")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache(last_access)")
+            con.execute("""
+              CREATE TABLE IF NOT EXISTS cache_stats (
+                endpoint TEXT PRIMARY KEY,
+                hits INTEGER NOT NULL DEFAULT 0,
+                stale INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0,
+                not_modified INTEGER NOT NULL DEFAULT 0,
+                stores INTEGER NOT NULL DEFAULT 0
+              )
+            """)
+            con.commit()
         finally:
             con.close()
 
-    def get(self, url: str, params: dict | None):
+    def _conn(self) -> sqlite3.Connection:
+        # Uma conexão longa por thread: leituras em WAL não bloqueiam entre si nem esperam o writer.
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.path, timeout=30)
+            con.execute("PRAGMA synchronous=NORMAL;")
+            self._local.con = con
+        return con
+
+    def _decode(self, row, ttl: int):
+        status_code, response_json, etag, last_modified, created_at, link_header, encoding, blob = row
+        age = _now_ts() - int(created_at)
+        stale = ttl != TTL_FOREVER and age > ttl
+        return {"stale": stale, "age": age, "etag": etag, "last_modified": last_modified, "link": link_header,
+                "json": _decode_payload(encoding, blob, response_json)}
+
+    def record(self, url: str, outcome: str):
+        endpoint = _endpoint_of(url)
+        with self._pending_lock:
+            self.run_totals[outcome] += 1
+            if outcome in CACHE_OUTCOMES:
+                counts = self._stats.setdefault(endpoint, [0] * len(CACHE_OUTCOMES))
+                counts[CACHE_OUTCOMES.index(outcome)] += 1
+
+    def get(self, url: str, params: dict | None, ttl: int | None = None):
+        t0 = time.perf_counter()
+        ttl = self.ttl if ttl is None else ttl
         key = _cache_key(url, params)
-        with self._lock, self._conn() as con:
-            cur = con.execute("SELECT status_code, response_json, etag, last_modified, created_at FROM cache WHERE cache_key=?",
-                              (key,))
+        with self._pending_lock:
+            row = self._pending.get(key) or self._inflight.get(key)
+        if row:
+            result = self._decode(row[3:], ttl)
+        else:
+            cur = self._conn().execute(
+                "SELECT status_code, response_json, etag, last_modified, created_at, link_header, encoding, response_blob "
+                "FROM cache WHERE cache_key=?",
+                (key,))
             row = cur.fetchone()
-            if not row:
+            result = None
+            if row:
+                try:
+                    result = self._decode(row, ttl)
+                except CacheCodecError as e:
+                    # Sem o codec a entrada é inútil: conta como ausente, e a resposta nova é regravada com outro.
+                    if not self._codec_warned:
+                        self._codec_warned = True
+                        print(f"[cache] {e}; essas entradas serão buscadas de novo", flush=True)
+            if result is None:
+                self.record(url, "misses")
+                METRICS.observe("cache_get", time.perf_counter() - t0, _endpoint_of(url), "miss")
                 return None
-            status_code, response_json, etag, last_modified, created_at = row
-
-            if (_now_ts() - int(created_at)) > self.ttl:
-                return {"stale": True, "etag": etag, "last_modified": last_modified, "json": json.loads(response_json) if response_json else None}
-            return {"stale": False, "etag": etag, "last_modified": last_modified, "json": json.loads(response_json) if response_json else None}
+            with self._pending_lock:
+                self._touched[key] = _now_ts()
+        self.record(url, "stale" if result["stale"] else "hits")
+        METRICS.observe("cache_get", time.perf_counter() - t0, _endpoint_of(url), "stale" if result["stale"] else "hit")
+        if not result["stale"] and result["age"] > self.ttl:
+            # Com o TTL único antigo esta entrada teria sido revalidada na rede.
+            self.record(url, "ttl_saved")
+        return result
+
+    def revalidated(self, url: str, params: dict | None):
+        # 304: o conteúdo continua válido, então a entrada volta a contar como nova.
+        with self._pending_lock:
+            self._revalidated[_cache_key(url, params)] = _now_ts()
+        self.record(url, "not_modified")
 
     def put(self, url: str, params: dict | None, status_code: int, response_json: dict | list | None,
-            etag: str | None, last_modified: str | None):
+            etag: str | None, last_modified: str | None, link_header: str | None = None):
         key = _cache_key(url, params)
-        with self._lock, self._conn() as con:
+        if self.projection:
+            response_json = project_payload(url, response_json)
+        encoding, blob = _encode_payload(response_json, self.compression)
+        row = (
+            key, url, _params_fingerprint(params), status_code, None,
+            etag, last_modified, _now_ts(), link_header, encoding, blob
+        )
+        with self._pending_lock:
+            self._pending[key] = row
+            full = len(self._pending) >= self.batch_size
+        self.record(url, "stores")
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        with self._write_lock:
+            with self._pending_lock:
+                self._inflight, self._pending = self._pending, {}
+                touched, self._touched = self._touched, {}
+                revalidated, self._revalidated = self._revalidated, {}
+                stats, self._stats = self._stats, {}
+            if not (self._inflight or touched or revalidated or stats):
+                return
+            try:
+                con = self._conn()
+                with con:
+                    con.executemany("""
+                      INSERT OR REPLACE INTO cache(cache_key, url, params_fpr, status_code, response_json, etag,
+                                                   last_modified, created_at, link_header, encoding, response_blob,
+                                                   last_access)
+                      VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?10, ?11, ?8)
+                    """, list(self._inflight.values()))
+                    con.executemany("UPDATE cache SET last_access=? WHERE cache_key=?",
+                                    [(ts, key) for key, ts in touched.items()])
+                    con.executemany("UPDATE cache SET created_at=?1, last_access=?1 WHERE cache_key=?2",
+                                    [(ts, key) for key, ts in revalidated.items()])
+                    con.executemany("""
+                      INSERT INTO cache_stats(endpoint, hits, stale, misses, not_modified, stores)
+                      VALUES (?, ?, ?, ?, ?, ?)
+                      ON CONFLICT(endpoint) DO UPDATE SET
+                        hits=hits+excluded.hits, stale=stale+excluded.stale, misses=misses+excluded.misses,
+                        not_modified=not_modified+excluded.not_modified, stores=stores+excluded.stores
+                    """, [(endpoint, *counts) for endpoint, counts in stats.items()])
+            except sqlite3.Error:
+                with self._pending_lock:
+                    self._pending = {**self._inflight, **self._pending}
+                raise
+            finally:
+                with self._pending_lock:
+                    self._inflight = {}
+
+    def _writer_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                with METRICS.timer("cache_flush"):
+                    self.flush()
+                if time.monotonic() - self._last_maintenance >= CACHE_MAINTENANCE_INTERVAL:
+                    self.maintain()
+            except sqlite3.Error as e:
+                print(f"[cache] falha ao gravar lote: {e}", flush=True)
+
+    def _db_bytes(self, con: sqlite3.Connection) -> int:
+        page_size = con.execute("PRAGMA page_size").fetchone()[0]
+        pages = con.execute("PRAGMA page_count").fetchone()[0]
+        free = con.execute("PRAGMA freelist_count").fetchone()[0]
+        return (pages - free) * page_size
+
+    def evict(self, max_bytes: int) -> int:
+        # LRU por last_access até ficar em 90% do orçamento, para não despejar a cada manutenção.
+        con = self._conn()
+        used = self._db_bytes(con)
+        if max_bytes <= 0 or used <= max_bytes:
+            return 0
+        rows = con.execute("SELECT COUNT(*) FROM cache").fetchone()[0] or 1
+        excess = used - int(max_bytes * 0.9)
+        n = min(rows, math.ceil(excess / max(1, used / rows)))
+        with con:
+            cur = con.execute(
+                "DELETE FROM cache WHERE cache_key IN (SELECT cache_key FROM cache ORDER BY last_access LIMIT ?)", (n,))
+        print(f"[cache] {cur.rowcount} entradas despejadas (uso {used / 1e6:.1f} MB > {max_bytes / 1e6:.1f} MB)", flush=True)
+        return cur.rowcount
+
+    def maintain(self, max_bytes: int = CACHE_MAX_BYTES, full: bool = False):
+        self._last_maintenance = time.monotonic()
+        self.flush()
+        con = self._conn()
+        evicted = self.evict(max_bytes)
+        if full and con.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            con.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+            con.execute("VACUUM;")
+        # execute() dá um único passo no PRAGMA, que assim libera só uma página do freelist;
+        # executescript() o executa até o fim.
+        con.executescript("PRAGMA incremental_vacuum;")
+        con.execute(f"PRAGMA wal_checkpoint({'TRUNCATE' if full else 'PASSIVE'});")
+        return evicted
+
+    def stats(self) -> dict:
+        self.flush()
+        con = self._conn()
+        per_endpoint = {}
+        for url, nbytes in con.execute(
+                "SELECT url, COALESCE(LENGTH(response_blob), 0) + COALESCE(LENGTH(response_json), 0) FROM cache"):
+            e = per_endpoint.setdefault(_endpoint_of(url), {"rows": 0, "bytes": 0, **dict.fromkeys(CACHE_OUTCOMES, 0)})
+            e["rows"] += 1
+            e["bytes"] += nbytes
+        for endpoint, *counts in con.execute(f"SELECT endpoint, {', '.join(CACHE_OUTCOMES)} FROM cache_stats"):
+            e = per_endpoint.setdefault(endpoint, {"rows": 0, "bytes": 0})
+            e.update(zip(CACHE_OUTCOMES, counts))
+        return {
+            "rows": sum(e["rows"] for e in per_endpoint.values()),
+            "bytes": sum(e["bytes"] for e in per_endpoint.values()),
+            "file_bytes": os.path.getsize(self.path),
+            "endpoints": per_endpoint,
+        }
+
+    def migrate(self, batch: int = 1000) -> tuple[int, int, int]:
+        # Converte linhas antigas (response_json em TEXT) para o formato comprimido/projetado atual.
+        self.flush()
+        size_before = os.path.getsize(self.path)
+        con = self._conn()
+        converted = 0
+        while True:
+            rows = con.execute(
+                "SELECT cache_key, url, response_json FROM cache WHERE response_json IS NOT NULL LIMIT ?",
+                (batch,)).fetchall()
+            if not rows:
+                break
+            updates = []
+            for key, url, response_json in rows:
+                payload = json.loads(response_json)
+                if self.projection:
+                    payload = project_payload(url, payload)
+                encoding, blob = _encode_payload(payload, self.compression)
+                updates.append((encoding, blob, key))
+            with con:
+                con.executemany("UPDATE cache SET encoding=?, response_blob=?, response_json=NULL WHERE cache_key=?",
+                                updates)
+            converted += len(updates)
+        con.execute("VACUUM;")
+        con.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        return converted, size_before, os.path.getsize(self.path)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._writer.join(timeout=5)
+        self.flush()
+
+
+CACHE = Lazy(lambda: SQLiteCache(CACHE_DB_PATH, CACHE_TTL_SECONDS))
+
+class CheckpointStore:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        with self._lock, self._con as con:
+            con.execute("PRAGMA journal_mode=WAL;")
+            con.execute("""
+              CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                mode TEXT NOT NULL,
+                started_at INTEGER NOT NULL,
+                finished_at INTEGER,
+                eligible_json TEXT
+              )
+            """)
             con.execute("""
-              INSERT OR REPLACE INTO cache(cache_key, url, params_fpr, status_code, response_json, etag, last_modified, created_at)
-              VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                key, url, _params_fingerprint(params), status_code,
-                json.dumps(response_json) if response_json is not None else None,
-                etag, last_modified, _now_ts()
-            ))
+              CREATE TABLE IF NOT EXISTS repos (
+                repo_key TEXT PRIMARY KEY,
+                finished_at INTEGER NOT NULL
+              )
+            """)
+            con.execute("""
+              CREATE TABLE IF NOT EXISTS pages (
+                repo_key TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                scheduled INTEGER NOT NULL,
+                finished_at INTEGER NOT NULL,
+                PRIMARY KEY (repo_key, page)
+              )
+            """)
+            con.execute("""
+              CREATE TABLE IF NOT EXISTS rows (
+                repo_key TEXT NOT NULL,
+                pr_number INTEGER NOT NULL,
+                row_json TEXT NOT NULL,
+                updated_at INTEGER NOT NULL,
+                PRIMARY KEY (repo_key, pr_number)
+              )
+            """)
 
+    def start_run(self, mode: str) -> int:
+        with self._lock, self._con as con:
+            if mode == "full":
+                con.execute("DELETE FROM repos")
+                con.execute("DELETE FROM pages")
+                con.execute("DELETE FROM rows")
+            cur = con.execute("INSERT INTO runs(mode, started_at) VALUES (?, ?)", (mode, _now_ts()))
+            return cur.lastrowid
+
+    def finish_run(self, run_id: int):
+        with self._lock, self._con as con:
+            con.execute("UPDATE runs SET finished_at=? WHERE run_id=?", (_now_ts(), run_id))
+
+    def save_eligible(self, run_id: int, eligible: list[dict]):
+        with self._lock, self._con as con:
+            con.execute("UPDATE runs SET eligible_json=? WHERE run_id=?", (json.dumps(eligible), run_id))
+
+    def last_eligible(self) -> list[dict] | None:
+        with self._lock:
+            row = self._con.execute(
+                "SELECT eligible_json FROM runs WHERE eligible_json IS NOT NULL ORDER BY run_id DESC LIMIT 1"
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def repo_finished_at(self, repo_key: str) -> int | None:
+        with self._lock:
+            row = self._con.execute("SELECT finished_at FROM repos WHERE repo_key=?", (repo_key,)).fetchone()
+        return int(row[0]) if row else None
+
+    def mark_repo_done(self, repo_key: str, finished_at: int | None = None):
+        with self._lock, self._con as con:
+            con.execute("INSERT OR REPLACE INTO repos(repo_key, finished_at) VALUES (?, ?)",
+                        (repo_key, finished_at or _now_ts()))
+
+    def finished_pages(self, repo_key: str) -> dict[int, int]:
+        with self._lock:
+            cur = self._con.execute("SELECT page, scheduled FROM pages WHERE repo_key=?", (repo_key,))
+            return {int(page): int(scheduled) for page, scheduled in cur.fetchall()}
+
+    def record_rows(self, repo_key: str, rows: list[dict], page: int | None = None, scheduled: int = 0):
+        now = _now_ts()
+        with self._lock, self._con as con:
+            con.executemany(
+                "INSERT OR REPLACE INTO rows(repo_key, pr_number, row_json, updated_at) VALUES (?, ?, ?, ?)",
+                [(repo_key, int(r["pr_number"]), json.dumps(r), now) for r in rows])
+            if page is not None:
+                con.execute("INSERT OR REPLACE INTO pages(repo_key, page, scheduled, finished_at) VALUES (?, ?, ?, ?)",
+                            (repo_key, page, scheduled, now))
+
+    def load_rows(self, repo_key: str) -> list[dict]:
+        with self._lock:
+            cur = self._con.execute("SELECT row_json FROM rows WHERE repo_key=? ORDER BY pr_number DESC", (repo_key,))
+            return [json.loads(r[0]) for r in cur.fetchall()]
+
+
+RATE_DEFAULT_LIMITS = {"core": 5000, "search": 30, "graphql": 5000}
+
+def _resource_for(url: str) -> str:
+    if url.startswith(GRAPHQL_URL):
+        return "graphql"
+    if url.startswith(f"{BASE_URL}/search/"):
+        return "search"
+    return "core"
+
+class RateBucket:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.remaining = None
+        self.reset_epoch = 0
+        self.blocked_until = 0.0
+
+    def headroom(self, now: float) -> int:
+        if now < self.blocked_until:
+            return 0
+        if self.remaining is None or (self.reset_epoch and now >= self.reset_epoch):
+            return self.limit
+        return self.remaining
+
+    def ready_at(self, now: float) -> float:
+        # Quando o bucket volta a ter cota: fim da quarentena e/ou reset da janela primária.
+        at = self.blocked_until if now < self.blocked_until else now
+        if self.remaining is not None and self.remaining <= 0 and now < self.reset_epoch:
+            at = max(at, self.reset_epoch)
+        return at
+
+
+class RetryLater(Exception):
+    # Levantada no lugar de um sleep quando o chamador sabe reagendar o trabalho (DEFER_RETRIES ativo).
+    # quota=True: nenhum token tinha cota; o PR não tem culpa e o adiamento não conta contra PR_MAX_DEFERRALS.
+    def __init__(self, not_before: float, reason: str, quota: bool = False):
+        super().__init__(f"{reason}; tentar de novo após {not_before:.0f}")
+        self.not_before = not_before
+        self.reason = reason
+        self.quota = quota
+
+
+# Ligado pelos workers de PR: em vez de dormir no backoff, safe_get levanta RetryLater e o PR volta para a
+# fila com horário mínimo. É um ContextVar para acompanhar as tarefas enviadas ao PAGE_EXECUTOR.
+DEFER_RETRIES = contextvars.ContextVar("DEFER_RETRIES", default=False)
+
+def _is_secondary_rate_limit(status_code: int, headers, text: str) -> bool:
+    if status_code not in (403, 429) or headers.get("X-RateLimit-Remaining") == "0":
+        return False
+    return bool(headers.get("Retry-After")) or "secondary rate limit" in (text or "").lower()
+
+def _rate_limit_text(r) -> str:
+    # Só 403/429 podem trazer a mensagem de limite secundário; r.text decodifica o corpo a cada acesso,
+    # então as respostas normais não passam por ele.
+    return r.text if r.status_code in (403, 429) else ""
+
+
+def http_pool_size(n_tokens: int, max_in_flight: int = TOKEN_MAX_IN_FLIGHT) -> int:
+    # Conexões mantidas por token: as threads que podem disputar o token (repos x PRs + páginas),
+    # divididas entre os tokens e limitadas pelo que o TokenScheduler deixa em voo por token.
+    if HTTP_POOL_SIZE > 0:
+        return HTTP_POOL_SIZE
+    threads = REPO_WORKERS * MAX_WORKERS + PAGE_WORKERS
+    return max(1, min(max_in_flight, -(-threads // max(1, n_tokens))))
+
+
+class HttpxSession:
+    # Mesma interface de requests.Session usada aqui (headers, request, close) sobre um httpx.Client,
+    # com HTTP/2 quando o pacote h2 está instalado: um único socket multiplexa as requisições do token.
+    def __init__(self, pool_size: int):
+        import httpx
+        connect, read = TIMEOUT
+        self.client = httpx.Client(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(read, connect=connect),
+        )
+        self.headers = self.client.headers
+
+    def request(self, method: str, url: str, timeout=None, **kwargs):
+        r = self.client.request(method, url, **kwargs)
+        r.ok = r.status_code < 400
+        return r
+
+    def close(self):
+        self.client.close()
+
+
+def make_http_session(pool_size: int, backend: str = HTTP_BACKEND):
+    if backend == "httpx":
+        if not HTTPX_AVAILABLE:
+            raise RuntimeError("HTTP_BACKEND=httpx requer o pacote httpx (pip install 'httpx[http2]').")
+        return HttpxSession(pool_size)
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.request import ACCEPT_ENCODING
+
+    session = requests.Session()
+    # O adapter padrão guarda só 10 conexões por host; acima disso cada requisição extra abre (e descarta) uma nova.
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    return session
 
-CACHE = SQLiteCache(CACHE_DB_PATH, CACHE_TTL_SECONDS)
 
 class TokenSession:
-    def __init__(self, token: str):
+    def __init__(self, token: str, pool_size: int = 10):
         self.token = token
-        self.session = requests.Session()
+        self.session = make_http_session(pool_size)
         self.session.headers.update({**DEFAULT_HEADERS, "Authorization": f"token {token}"})
-        self.remaining = None
-        self.reset_epoch = 0
-        self.lock = threading.Lock()
+        self.buckets = {name: RateBucket(limit) for name, limit in RATE_DEFAULT_LIMITS.items()}
+        self.in_flight = 0
 
-    def update_rate(self, resp: requests.Response):
+    def update_rate(self, headers, resource: str):
+        bucket = self.buckets.get(headers.get("X-RateLimit-Resource") or resource) or self.buckets[resource]
         try:
-            self.remaining = int(resp.headers.get("X-RateLimit-Remaining", "0") or "0")
-            self.reset_epoch = int(resp.headers.get("X-RateLimit-Reset", "0") or "0")
-        except Exception:
+            if headers.get("X-RateLimit-Limit"):
+                bucket.limit = int(headers["X-RateLimit-Limit"])
+            if headers.get("X-RateLimit-Remaining") is not None:
+                bucket.remaining = int(headers["X-RateLimit-Remaining"])
+            if headers.get("X-RateLimit-Reset"):
+                bucket.reset_epoch = int(headers["X-RateLimit-Reset"])
+        except (TypeError, ValueError):
             pass
 
-    def wait_if_needed(self):
-        if self.remaining is not None and self.remaining <= 0:
-            wait = max(1, self.reset_epoch - int(time.time())) + 2
-            time.sleep(min(wait, 120))
 
+class TokenScheduler:
+    # Despacha cada requisição para o token com mais cota livre no recurso (core/search/graphql),
+    # com no máximo max_in_flight requisições simultâneas por token. Sem token disponível, o chamador
+    # espera na Condition (liberando o lock) até uma devolução ou até o próximo reset de cota.
+    def __init__(self, tokens: list[str], max_in_flight: int = TOKEN_MAX_IN_FLIGHT, clock=time.time):
+        pool_size = http_pool_size(len(tokens), max_in_flight)
+        self.pool = [TokenSession(t, pool_size) for t in tokens]
+        self.max_in_flight = max_in_flight
+        self.clock = clock
+        self._cond = threading.Condition()
+
+    def quarantine(self, sess: TokenSession, resource: str, until: float, reason: str):
+        with self._cond:
+            bucket = sess.buckets[resource]
+            if until <= bucket.blocked_until:
+                return
+            fresh = bucket.blocked_until <= self.clock()
+            bucket.blocked_until = until
+        METRICS.inc("token_quarantine", resource, reason)
+        if fresh:
+            print(f"[tokens] token ...{sess.token[-4:]} em quarentena ({resource}, {reason}) por "
+                  f"{until - self.clock():.0f}s", flush=True)
+
+    def _best(self, resource: str, now: float) -> TokenSession | None:
+        # acquire() já desconta cada lease de bucket.remaining; in_flight só limita a concorrência
+        # e desempata tokens com a mesma cota.
+        best, best_score = None, (0, 0)
+        for s in self.pool:
+            if s.in_flight >= self.max_in_flight:
+                continue
+            score = (s.buckets[resource].headroom(now), -s.in_flight)
+            if score[0] > 0 and score > best_score:
+                best, best_score = s, score
+        return best
+
+    def _ready_at(self, resource: str, now: float) -> float:
+        # Instante em que o primeiro token recupera cota; <= now se algum tem cota e só está ocupado.
+        return min((s.buckets[resource].ready_at(now) for s in self.pool), default=now)
+
+    def _next_wakeup(self, resource: str, now: float) -> float:
+        ready = self._ready_at(resource, now)
+        if ready <= now:
+            return 5.0
+        return min(60.0, max(0.5, ready - now + 1))
+
+    def acquire(self, resource: str = "core") -> TokenSession:
+        t0 = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                now = self.clock()
+                sess = self._best(resource, now)
+                if sess is not None:
+                    sess.in_flight += 1
+                    bucket = sess.buckets[resource]
+                    if bucket.remaining is not None and now < bucket.reset_epoch:
+                        bucket.remaining -= 1
+                    break
+                ready = self._ready_at(resource, now)
+                if ready > now and DEFER_RETRIES.get():
+                    # Todos os tokens estão sem cota: devolve o trabalho à fila em vez de prender o worker.
+                    METRICS.observe("token_wait", time.perf_counter() - t0, resource, "deferred")
+                    raise RetryLater(ready + 0.05, f"sem cota {resource} em nenhum token", quota=True)
+                waited = True
+                self._cond.wait(timeout=self._next_wakeup(resource, now))
+        # "waited": não havia token com cota/vaga livre; "immediate" mede só a disputa pelo lock.
+        METRICS.observe("token_wait", time.perf_counter() - t0, resource, "waited" if waited else "immediate")
+        return sess
+
+    def release(self, sess: TokenSession, resource: str = "core", headers=None):
+        with self._cond:
+            sess.in_flight -= 1
+            if headers is not None:
+                sess.update_rate(headers, resource)
+            self._cond.notify_all()
+
+    def request(self, method: str, url: str, **kwargs):
+        resource = _resource_for(url)
+        sess = self.acquire(resource)
+        r = None
+        t0 = time.perf_counter()
+        try:
+            r = sess.session.request(method, url, timeout=TIMEOUT, **kwargs)
+            if _is_secondary_rate_limit(r.status_code, r.headers, _rate_limit_text(r)):
+                retry_after = int(r.headers.get("Retry-After", "0") or 0) or 60
+                self.quarantine(sess, resource, self.clock() + retry_after, "secondary")
+            return r
+        finally:
+            METRICS.observe("http", time.perf_counter() - t0, _endpoint_of(url),
+                            str(r.status_code) if r is not None else "exception")
+            self.release(sess, resource, r.headers if r is not None else None)
+
+
+SCHEDULER = Lazy(lambda: TokenScheduler(TOKENS))
+
+class TokenBucket:
+    # Pacing local: reserve() devolve quanto esperar antes de enviar; o saldo negativo enfileira quem chega depois.
+    def __init__(self, rate_per_sec: float, capacity: float, clock=time.monotonic):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
 
-class TokenRotator:
-    def __init__(self, tokens: list[str]):
-        self.pool = [TokenSession(t) for t in tokens]
-        self.idx = 0
-        self.lock = threading.Lock()
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            METRICS.observe("pacer_wait", delay)
+            time.sleep(delay)
 
-    def pick(self) -> TokenSession:
-        with self.lock:
-            n = len(self.pool)
-            for _ in range(n):
-                s = self.pool[self.idx]
-                self.idx = (self.idx + 1) % n
-                if s.remaining is None or s.remaining > 0:
-                    return s
-            s = self.pool[0]
-            s.wait_if_needed()
-            return s
 
+SEARCH_PACER = TokenBucket(SEARCH_REQUESTS_PER_MINUTE * max(1, len(TOKENS)) / 60.0, SEARCH_BURST)
 
-ROTATOR = TokenRotator(TOKENS)
+def _backoff_seconds(i: int) -> float:
+    return min(90, (2 ** i) + random.random())
 
-def _sleep_backoff(i: int):
-    time.sleep(min(90, (2 ** i) + random.random()))
+def _pause(seconds: float, endpoint: str = "", reason: str = "backoff"):
+    METRICS.observe("sleep", seconds, endpoint, reason)
+    time.sleep(seconds)
 
-def safe_get_json(url: str, params: dict | None = None, attempts: int = 6):
-    cached = CACHE.get(url, params)
+def _sleep_backoff(i: int, endpoint: str = ""):
+    _pause(_backoff_seconds(i), endpoint)
+
+def _wait_or_defer(seconds: float, endpoint: str, reason: str):
+    # Esperas curtas acontecem no próprio worker; as longas viram RetryLater quando o chamador sabe reagendar.
+    if seconds > RETRY_INLINE_MAX and DEFER_RETRIES.get():
+        raise RetryLater(time.time() + seconds, f"{reason} em {endpoint}")
+    _pause(seconds, endpoint, reason)
+
+def _conditional_headers(cached: dict | None) -> dict:
     headers = {}
     if cached:
         if cached.get("etag"):
             headers["If-None-Match"] = cached["etag"]
         elif cached.get("last_modified"):
             headers["If-Modified-Since"] = cached["last_modified"]
+    return headers
+
+def _is_primary_rate_limit(status_code: int, headers) -> bool:
+    # O TokenScheduler já registrou a cota zerada deste token; a próxima tentativa vai para outro token
+    # ou espera o reset sem ocupar lock.
+    return status_code in (403, 429) and headers.get("X-RateLimit-Remaining") == "0"
+
+def _retry_delay(status_code: int, headers, text: str, attempt: int) -> float | None:
+    if status_code == 403 and headers.get("X-RateLimit-Remaining") == "0":
+        wait = max(1, int(headers.get("X-RateLimit-Reset", "0") or 0) - int(time.time())) + 2
+        return min(wait, 120)
+
+    if _is_secondary_rate_limit(status_code, headers, text):
+        retry_after = int(headers.get("Retry-After", "0") or 0)
+        return retry_after or _backoff_seconds(attempt)
+
+    if status_code in (500, 502, 503, 504):
+        return _backoff_seconds(attempt)
+    return None
+
+def _store_response(url: str, params: dict | None, status_code: int, headers, payload):
+    etag = headers.get("ETag") or None
+    last_mod = headers.get("Last-Modified") or None
+    # "" = resposta sem Link; NULL fica para linhas gravadas antes de o cache guardar o cabeçalho.
+    CACHE.put(url, params, status_code, payload, etag, last_mod, headers.get("Link") or "")
+
+def _link_unknown(link: str | None, data, params: dict | None) -> bool:
+    # Página cheia sem o Link gravado: não dá para saber se há outras, então a entrada não serve para paginar.
+    per_page = int((params or {}).get("per_page", 30))
+    return link is None and isinstance(data, list) and len(data) >= per_page
+
+def safe_get(url: str, params: dict | None = None, attempts: int = 6, pacer: TokenBucket | None = None,
+             ttl: int | None = None):
+    t0 = time.perf_counter()
+    endpoint = _endpoint_of(url)
+    cached = CACHE.get(url, params, ttl_for(url) if ttl is None else ttl)
+    if cached and _link_unknown(cached.get("link"), cached.get("json"), params):
+        cached = None
+    headers = _conditional_headers(cached)
+    if cached and cached.get("stale") is False and cached.get("json") is not None:
+        METRICS.inc("safe_get", endpoint, "hit")
+        return cached["json"], cached.get("link")
+
+    outcome = "exhausted"
+    try:
+        for i in range(attempts):
+            if pacer is not None:
+                pacer.acquire()
+            try:
+                r = SCHEDULER.request("GET", url, params=params, headers=headers or None)
+            except RetryLater:
+                raise
+            except Exception:
+                METRICS.inc("safe_get", endpoint, "exception")
+                _wait_or_defer(_backoff_seconds(i), endpoint, "exception")
+                continue
+
+            if r.status_code == 304 and cached:
+                CACHE.revalidated(url, params)
+                outcome = "304"
+                return cached.get("json"), r.headers.get("Link") or cached.get("link")
+
+            # Limite primário ou secundário: o TokenScheduler já pôs o token em quarentena, então a próxima
+            # tentativa sai na hora por outro token (ou espera/adia só se nenhum tiver cota).
+            text = _rate_limit_text(r)
+            if _is_primary_rate_limit(r.status_code, r.headers) or \
+                    _is_secondary_rate_limit(r.status_code, r.headers, text):
+                METRICS.inc("safe_get", endpoint, "rate_limited")
+                continue
+
+            delay = _retry_delay(r.status_code, r.headers, text, i)
+            if delay is not None:
+                METRICS.inc("safe_get", endpoint, "retry")
+                _wait_or_defer(delay, endpoint, "retry")
+                continue
+
+            if r.ok:
+                with METRICS.timer("json_parse", endpoint):
+                    try:
+                        payload = r.json()
+                    except ValueError:
+                        payload = None
+                _store_response(url, params, r.status_code, r.headers, payload)
+                outcome = str(r.status_code)
+                return payload, r.headers.get("Link")
+
+            METRICS.inc("safe_get", endpoint, "error")
+            _wait_or_defer(_backoff_seconds(i), endpoint, "error")
+
+        return None, None
+    except RetryLater:
+        outcome = "deferred"
+        raise
+    finally:
+        METRICS.inc("safe_get", endpoint, outcome)
+        METRICS.observe("safe_get", time.perf_counter() - t0, endpoint, outcome)
+
+def safe_get_json(url: str, params: dict | None = None, attempts: int = 6, ttl: int | None = None):
+    return safe_get(url, params, attempts, ttl=ttl)[0]
+
+def safe_search_json(url: str, params: dict | None = None, attempts: int = 6):
+    return safe_get(url, params, attempts, pacer=SEARCH_PACER)[0]
+
+def _last_page(link_header: str | None) -> int | None:
+    for part in (link_header or "").split(","):
+        if 'rel="last"' in part:
+            m = re.search(r"[?&]page=(\d+)", part)
+            if m:
+                return int(m.group(1))
+    return None
 
-        if cached.get("stale") is False and cached.get("json") is not None:
-            return cached["json"]
+# Pool próprio para as páginas: as tarefas dele só chamam safe_get, então pode ser usado de dentro dos workers de PR.
+PAGE_EXECUTOR = ThreadPoolExecutor(max_workers=PAGE_WORKERS, thread_name_prefix="page")
+
+def iter_pages(url: str, params: dict | None = None, per_page: int = 100, ttl: int | None = None,
+               prefetch: int = PAGE_PREFETCH, skip=()):
+    # Gera (página, payload) em ordem. A primeira página revela o total via Link rel="last";
+    # as demais são buscadas em paralelo, no máximo `prefetch` à frente do consumidor.
+    base = {**(params or {}), "per_page": per_page}
+    data, link = safe_get(url, {**base, "page": 1}, ttl=ttl)
+    yield 1, data
+    last = _last_page(link)
+    if not data or last is None:
+        return
+
+    def _fetch(pg):
+        return safe_get(url, {**base, "page": pg}, ttl=ttl)[0]
+
+    remaining = iter(range(2, last + 1))
+    pending = deque()
+
+    def _schedule():
+        while len(pending) < max(1, prefetch):
+            pg = next(remaining, None)
+            if pg is None:
+                return
+            # copy_context leva DEFER_RETRIES do worker de PR para a thread da página.
+            fut = None if pg in skip else PAGE_EXECUTOR.submit(contextvars.copy_context().run, _fetch, pg)
+            pending.append((pg, fut))
+
+    try:
+        _schedule()
+        while pending:
+            pg, fut = pending.popleft()
+            _schedule()
+            yield pg, fut.result() if fut else None
+    finally:
+        # Consumidor parou cedo (limite de PRs, modo incremental): descarta o que ainda não começou.
+        for _, fut in pending:
+            if fut:
+                fut.cancel()
+
+def safe_get_all(url: str, params: dict | None = None, per_page: int = 100, ttl: int | None = None) -> list:
+    items = []
+    for _, data in iter_pages(url, params, per_page=per_page, ttl=ttl, prefetch=PAGE_WORKERS):
+        if not isinstance(data, list):
+            break
+        items.extend(data)
+    return items
+
+def safe_post_graphql(query: str, variables: dict | None = None, attempts: int = 6):
+    body = {"query": query, "variables": variables or {}}
+    cached = CACHE.get(GRAPHQL_URL, body)
+    if cached and cached.get("stale") is False and cached.get("json") is not None:
+        return cached["json"]
 
     for i in range(attempts):
-        sess = ROTATOR.pick()
         try:
-            with sess.lock:
-                sess.wait_if_needed()
-                r = sess.session.get(url, params=params, timeout=TIMEOUT, headers=headers or None)
-                sess.update_rate(r)
+            r = SCHEDULER.request("POST", GRAPHQL_URL, json=body)
         except Exception:
-            _sleep_backoff(i)
+            _sleep_backoff(i, "/graphql")
             continue
 
-        if r.status_code == 304 and cached:
-            return cached.get("json")
-
-        if r.status_code == 403 and r.headers.get("X-RateLimit-Remaining") == "0":
-            wait = max(1, int(r.headers.get("X-RateLimit-Reset", "0") or 0) - int(time.time())) + 2
-            time.sleep(min(wait, 120))
-            continue
-
-        if r.status_code in (429, 403) and ("secondary rate limit" in (r.text or "").lower()):
-            retry_after = int(r.headers.get("Retry-After", "0") or 0)
-            time.sleep(retry_after or min(90, (2 ** i) + random.random()))
+        if _is_primary_rate_limit(r.status_code, r.headers):
             continue
 
-        if r.status_code in (500, 502, 503, 504):
-            _sleep_backoff(i)
+        delay = _retry_delay(r.status_code, r.headers, _rate_limit_text(r), i)
+        if delay is not None:
+            _pause(delay, "/graphql", "retry")
             continue
 
         if r.ok:
-            etag = r.headers.get("ETag") or None
-            last_mod = r.headers.get("Last-Modified") or None
             try:
-                payload = r.json()
+                payload = r.json() or {}
             except ValueError:
-                payload = None
-            CACHE.put(url, params, r.status_code, payload, etag, last_mod)
-            return payload
+                payload = {}
+            errors = payload.get("errors") or []
+            if any(e.get("type") == "RATE_LIMITED" for e in errors):
+                _sleep_backoff(i, "/graphql")
+                continue
+            for e in errors:
+                print(f"[graphql] erro: {e.get('message')}", flush=True)
+            data = payload.get("data")
+            if data is not None and not errors:
+                _store_response(GRAPHQL_URL, body, r.status_code, {}, data)
+            return data
 
-        _sleep_backoff(i)
+        _sleep_backoff(i, "/graphql")
 
     return None
 
@@ -229,7 +1210,7 @@ def iter_top_repositories_sorted(max_pages=10, per_page=100):
             "per_page": per_page,
             "page": page,
         }
-        data = safe_get_json(url, params=params)
+        data = safe_search_json(url, params=params)
         items = (data or {}).get("items") or []
         if not items:
             break
@@ -245,40 +1226,57 @@ def get_closed_prs_count(owner, repo):
     q = f"repo:{owner}/{repo} is:pr is:closed"
     url = f"{BASE_URL}/search/issues"
     params = {"q": q, "per_page": 1}
-    data = safe_get_json(url, params=params)
+    data = safe_search_json(url, params=params)
     if not data:
         return 0
     return int(data.get("total_count", 0))
 
-def get_reviews(owner, repo, pr_number):
+def get_closed_prs_count_link(owner, repo):
+    # Com per_page=1, o número da página rel="last" é o total de PRs fechados; custa uma chamada core, não search.
+    url = f"{BASE_URL}/repos/{owner}/{repo}/pulls"
+    data, link = safe_get(url, params={"state": "closed", "per_page": 1})
+    last = _last_page(link)
+    if last is not None:
+        return last
+    return len(data) if isinstance(data, list) else 0
+
+def count_closed_prs(repos: list[tuple[str, str]], strategy: str = ELIGIBILITY_STRATEGY) -> list[int]:
+    if strategy == "graphql":
+        from graphql_collector import closed_pr_counts
+        counts = closed_pr_counts(repos)
+        return [counts.get(f"{owner}/{name}", 0) for owner, name in repos]
+    if strategy == "link":
+        return [get_closed_prs_count_link(owner, name) for owner, name in repos]
+    return [get_closed_prs_count(owner, name) for owner, name in repos]
+
+def get_reviews(owner, repo, pr_number, ttl=None):
     url = f"{BASE_URL}/repos/{owner}/{repo}/pulls/{pr_number}/reviews"
-    data = safe_get_json(url) or []
+    data = safe_get_all(url, ttl=ttl)
     return [rv for rv in data if isinstance(rv, dict)]
 
-def get_issue_comments(owner, repo, pr_number):
+def get_issue_comments(owner, repo, pr_number, ttl=None):
     url = f"{BASE_URL}/repos/{owner}/{repo}/issues/{pr_number}/comments"
-    data = safe_get_json(url) or []
+    data = safe_get_all(url, ttl=ttl)
     return [c for c in data if isinstance(c, dict)]
 
-def get_review_comments(owner, repo, pr_number):
+def get_review_comments(owner, repo, pr_number, ttl=None):
     url = f"{BASE_URL}/repos/{owner}/{repo}/pulls/{pr_number}/comments"
-    data = safe_get_json(url) or []
+    data = safe_get_all(url, ttl=ttl)
     return [c for c in data if isinstance(c, dict)]
 
-def get_pr_files(owner, repo, pr_number):
+def get_pr_files(owner, repo, pr_number, ttl=None):
     url = f"{BASE_URL}/repos/{owner}/{repo}/pulls/{pr_number}/files"
-    data = safe_get_json(url) or []
+    data = safe_get_all(url, ttl=ttl)
     return [f for f in data if isinstance(f, dict)]
 
-def get_pr_detail(owner, repo, pr_number):
+def get_pr_detail(owner, repo, pr_number, ttl=None):
     url = f"{BASE_URL}/repos/{owner}/{repo}/pulls/{pr_number}"
-    return safe_get_json(url) or {}
+    return safe_get_json(url, ttl=ttl) or {}
 
 def _parse_dt(iso_str):
     return _iso_to_dt(iso_str)
 
-def fetch_single_pr(owner: str, repo: str, pr: dict):
-
+def _pr_duration_hours(pr: dict) -> float | None:
     merged_at = pr.get("merged_at")
     closed_at = pr.get("closed_at")
     created_at = pr.get("created_at")
@@ -287,21 +1285,12 @@ def fetch_single_pr(owner: str, repo: str, pr: dict):
 
     end_raw = merged_at or closed_at
     try:
-        duration_h = (_parse_dt(end_raw) - _parse_dt(created_at)).total_seconds() / 3600.0
+        return (_parse_dt(end_raw) - _parse_dt(created_at)).total_seconds() / 3600.0
     except Exception:
         return None
-    if duration_h < 1.0:
-        return None
-
-    reviews = get_reviews(owner, repo, pr["number"])
-    if len(reviews) < 1:
-        return None
-
-    detail = get_pr_detail(owner, repo, pr["number"])
-    issue_comments = get_issue_comments(owner, repo, pr["number"])
-    review_comments = get_review_comments(owner, repo, pr["number"])
-    files = get_pr_files(owner, repo, pr["number"])
 
+def build_pr_row(owner: str, repo: str, pr: dict, duration_h: float, reviews: list, detail: dict,
+                 issue_comments: list, review_comments: list, files: list) -> dict:
     users = set()
     u = (detail.get("user") or {}).get("login")
     if u:
@@ -329,7 +1318,7 @@ def fetch_single_pr(owner: str, repo: str, pr: dict):
         "repo_name": repo,
         "repo": f"{owner}/{repo}",
         "pr_number": pr["number"],
-        "state": "merged" if merged_at else "closed",
+        "state": "merged" if pr.get("merged_at") else "closed",
         "num_files": num_files,
         "additions": additions,
         "deletions": deletions,
@@ -340,119 +1329,627 @@ def fetch_single_pr(owner: str, repo: str, pr: dict):
         "reviews_count": len(reviews),
     }
 
-def get_pull_requests(owner, repo, max_deep=MAX_DEEP_PRS_PER_REPO):
+def fetch_single_pr(owner: str, repo: str, pr: dict):
 
-    print(f"[início] {owner}/{repo} - limite: {max_deep} PRs", flush=True)
-    results = []
-    page = 1
-    per_page = 100
-    deep_analyzed = 0
+    duration_h = _pr_duration_hours(pr)
+    if duration_h is None or duration_h < MIN_ANALYSIS_HOURS:
+        return None
+
+    ttl = _pr_ttl(pr)
+    reviews = get_reviews(owner, repo, pr["number"], ttl=ttl)
+    if len(reviews) < 1:
+        return None
+
+    detail = get_pr_detail(owner, repo, pr["number"], ttl=ttl)
+    issue_comments = get_issue_comments(owner, repo, pr["number"], ttl=ttl)
+    review_comments = get_review_comments(owner, repo, pr["number"], ttl=ttl)
+    files = get_pr_files(owner, repo, pr["number"], ttl=ttl)
+
+    return build_pr_row(owner, repo, pr, duration_h, reviews, detail, issue_comments, review_comments, files)
+
+def prefilter_listed_prs(prs: list) -> list[dict]:
+    # Regras que o payload de /pulls já permite avaliar, antes de qualquer chamada por PR.
+    keep = []
+    for pr in prs:
+        if not isinstance(pr, dict) or "number" not in pr:
+            continue
+        duration_h = _pr_duration_hours(pr)
+        if duration_h is None or duration_h < MIN_ANALYSIS_HOURS:
+            continue
+        keep.append(pr)
+    return keep
 
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
-        futures = []
+def drop_unreviewed_prs(owner: str, repo: str, prs: list[dict]) -> list[dict]:
+    if REVIEWS_PROBE != "graphql" or not prs:
+        return prs
+    from graphql_collector import probe_review_counts
+    counts = probe_review_counts(owner, repo, [pr["number"] for pr in prs])
+    return [pr for pr in prs if counts.get(pr["number"], 1) > 0]
+
+def _closed_since(pr: dict, since: int) -> bool:
+    closed_at = pr.get("merged_at") or pr.get("closed_at")
+    return bool(closed_at) and _iso_to_dt(closed_at).timestamp() >= since
+
+def fetch_pr_isolated(owner: str, repo: str, pr: dict):
+    # Uma tentativa, sem dormir no worker: RetryLater (cota, 5xx) ou uma falha inesperada voltam como erro
+    # para o chamador reagendar o PR ou desistir dele. Uma falha num PR nunca derruba o repositório.
+    t0 = time.perf_counter()
+    token = DEFER_RETRIES.set(True)
+    try:
+        item = fetch_single_pr(owner, repo, pr)
+        outcome, error = ("row" if item else "skipped"), None
+    except RetryLater as e:
+        item, outcome, error = None, "deferred", e
+    except Exception as e:
+        item, outcome, error = None, "error", e
+    finally:
+        DEFER_RETRIES.reset(token)
+    METRICS.observe("pr", time.perf_counter() - t0, "", outcome)
+    return item, error
+
+def iter_pull_requests(owner, repo, max_deep=MAX_DEEP_PRS_PER_REPO, checkpoint: CheckpointStore | None = None,
+                       since: int | None = None, queue_depth: int = PR_QUEUE_DEPTH):
+
+    key = f"{owner}/{repo}"
+    print(f"[início] {key} - limite: {max_deep} PRs" + (f" | desde {since}" if since else ""), flush=True)
+    totals = {"rows": 0, "failed": 0, "retries": 0, "finished": 0}
+    deep_analyzed = 0
+    # Páginas só são checkpointáveis na listagem completa; ordenadas por "updated" elas mudam entre execuções.
+    done_pages = checkpoint.finished_pages(key) if checkpoint and since is None else {}
+    page_state = {}
+
+    def _page_finished(pg):
+        st = page_state.pop(pg)
+        if checkpoint:
+            # PRs que falharam deixam a página incompleta, para que --resume os tente de novo.
+            complete = since is None and st["scheduled"] == st["candidates"] and st["failed"] == 0
+            checkpoint.record_rows(key, st["rows"], page=pg if complete else None, scheduled=st["scheduled"])
+
+    # PRs adiados (RetryLater ou falha com retentativas sobrando) esperam num heap por horário mínimo;
+    # o worker que falhou já está livre para o próximo PR.
+    deferred = []
+    tries = {}
+    seq = itertools.count()
+
+    def _settle(fut, pr, pg):
+        item, error = fut.result()
+        n = tries.setdefault(pr["number"], {"retries": 0, "deferrals": 0})
+        if isinstance(error, RetryLater) and (error.quota or n["deferrals"] < PR_MAX_DEFERRALS):
+            n["deferrals"] += 0 if error.quota else 1
+            heapq.heappush(deferred, (error.not_before, next(seq), pr, pg))
+            return None
+        if error is not None and not isinstance(error, RetryLater) and n["retries"] < PR_RETRIES:
+            heapq.heappush(deferred, (time.time() + _backoff_seconds(n["retries"]), next(seq), pr, pg))
+            n["retries"] += 1
+            return None
+        tries.pop(pr["number"])
+        st = page_state[pg]
+        st["pending"] -= 1
+        totals["finished"] += 1
+        totals["retries"] += n["retries"]
+        if error is not None:
+            totals["failed"] += 1
+            st["failed"] += 1
+            print(f"[erro] {key}#{pr['number']}: {error!r} após {n['retries'] + 1} tentativas"
+                  + (f" e {n['deferrals']} adiamentos" if n["deferrals"] else ""), flush=True)
+        elif item:
+            totals["rows"] += 1
+            st["rows"].append(item)
+        # A página só fecha depois que o laço de agendamento terminou de submeter os PRs dela.
+        if st["pending"] == 0 and st["listed"]:
+            _page_finished(pg)
+        return item
+
+    url = f"{BASE_URL}/repos/{owner}/{repo}/pulls"
+    params = {"state": "closed"}
+    list_ttl = None
+    if since is not None:
+        params.update({"sort": "updated", "direction": "desc"})
+        # A listagem delta precisa refletir o estado atual: sempre revalida (ETag) em vez de servir o cache.
+        list_ttl = 0
+    # Etapa de listagem: iter_pages já busca as próximas páginas enquanto os workers processam a atual.
+    pages = iter_pages(url, params, ttl=list_ttl, skip=done_pages)
+
+    ex = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="pr")
+    in_flight = {}
+
+    def _reap(final: bool):
+        # Entrega resultados até caber mais um PR na fila (ou, no fim, até não sobrar nada), devolvendo
+        # à fila os adiados cujo horário já venceu.
         while True:
+            now = time.time()
+            while deferred and deferred[0][0] <= now and len(in_flight) < queue_depth:
+                _, _, pr, pg = heapq.heappop(deferred)
+                in_flight[ex.submit(fetch_pr_isolated, owner, repo, pr)] = (pr, pg)
+            if (not in_flight and not deferred) if final else len(in_flight) < queue_depth:
+                return
+            timeout = max(0.0, deferred[0][0] - now) if deferred else None
+            if not in_flight:
+                # Só há PRs adiados: nenhum worker está ocupado, esta thread espera o primeiro vencer.
+                time.sleep(timeout)
+                continue
+            finished, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                item = _settle(fut, *in_flight.pop(fut))
+                if item:
+                    yield item
+
+    try:
+        for page, data in pages:
             if max_deep is not None and deep_analyzed >= max_deep:
-                print(f"[limite] {owner}/{repo} - atingiu {max_deep} PRs analisados", flush=True)
+                print(f"[limite] {key} - atingiu {max_deep} PRs analisados", flush=True)
                 break
 
-            url = f"{BASE_URL}/repos/{owner}/{repo}/pulls"
-            params = {"state": "closed", "per_page": per_page, "page": page}
-            data = safe_get_json(url, params=params)
-            if not data or not isinstance(data, list) or not data:
+            if page in done_pages:
+                deep_analyzed += done_pages[page]
+                continue
+
+            if not data or not isinstance(data, list):
                 break
 
-            for pr in data:
+            candidates = prefilter_listed_prs(data)
+            if since is not None:
+                candidates = [pr for pr in candidates if _closed_since(pr, since)]
+            candidates = drop_unreviewed_prs(owner, repo, candidates)
+
+            page_state[page] = {"pending": 0, "scheduled": 0, "failed": 0, "candidates": len(candidates), "rows": [],
+                               "listed": False}
+            for pr in candidates:
                 if max_deep is not None and deep_analyzed >= max_deep:
                     break
-                futures.append(ex.submit(fetch_single_pr, owner, repo, pr))
+                # Backpressure: com a fila cheia, entrega resultados prontos antes de agendar mais.
+                yield from _reap(final=False)
+                in_flight[ex.submit(fetch_pr_isolated, owner, repo, pr)] = (pr, page)
+                page_state[page]["pending"] += 1
+                page_state[page]["scheduled"] += 1
                 deep_analyzed += 1
                 if deep_analyzed % 200 == 0:
-                    print(f"[progresso] {owner}/{repo}: {deep_analyzed}/{max_deep} PRs agendados", flush=True)
-
-            page += 1
-            time.sleep(0.02)
+                    print(f"[progresso] {key}: {deep_analyzed}/{max_deep} PRs agendados, {totals['finished']} concluídos",
+                          flush=True)
+            page_state[page]["listed"] = True
+            if page_state[page]["pending"] == 0:
+                _page_finished(page)
+
+            if since is not None:
+                oldest = data[-1].get("updated_at") if isinstance(data[-1], dict) else None
+                if oldest and _iso_to_dt(oldest).timestamp() < since:
+                    break
+        pages.close()
+
+        yield from _reap(final=True)
+    finally:
+        pages.close()
+        ex.shutdown(wait=True, cancel_futures=True)
+
+    print(f"[fim] {key}: {totals['rows']} PRs coletados (válidos)"
+          + (f", {totals['failed']} falharam" if totals["failed"] else "")
+          + (f", {totals['retries']} retentativas" if totals["retries"] else ""), flush=True)
+
+def get_pull_requests(owner, repo, max_deep=MAX_DEEP_PRS_PER_REPO, checkpoint: CheckpointStore | None = None,
+                      since: int | None = None):
+    return list(iter_pull_requests(owner, repo, max_deep=max_deep, checkpoint=checkpoint, since=since))
+
+
+ELIGIBILITY_TARGET = int(os.getenv("ELIGIBILITY_TARGET", "200"))
+MIN_CLOSED_PRS = int(os.getenv("MIN_CLOSED_PRS", "100"))
+
+DATASET_COLUMNS = [
+    "owner", "repo_name", "repo", "stars", "html_url", "total_closed_prs",
+    "pr_number", "state",
+    "num_files", "additions", "deletions",
+    "analysis_time_hours",
+    "description_length",
+    "participants_count", "comments_count",
+    "reviews_count",
+]
+
+def eligibility_item(r: dict, total_closed: int) -> dict:
+    owner = r["owner"]["login"]
+    name = r["name"]
+    return {
+        "owner": owner,
+        "repo": name,
+        "key": f"{owner}/{name}",
+        "stars": r.get("stargazers_count", 0),
+        "html_url": r.get("html_url", ""),
+        "total_closed_prs": total_closed,
+    }
 
-        for fut in as_completed(futures):
-            item = fut.result()
-            if item:
-                results.append(item)
+def annotate_repo_rows(prs: list[dict], item: dict) -> list[dict]:
+    for pr in prs:
+        pr.update({
+            "stars": item["stars"],
+            "html_url": item["html_url"],
+            "total_closed_prs": item["total_closed_prs"]
+        })
+    return prs
+
+DATASET_DTYPES = {
+    "owner": "string", "repo_name": "string", "repo": "string", "stars": "int64", "html_url": "string",
+    "total_closed_prs": "int64", "pr_number": "int64", "state": "string",
+    "num_files": "int32", "additions": "int64", "deletions": "int64",
+    "analysis_time_hours": "float64",
+    "description_length": "int32",
+    "participants_count": "int32", "comments_count": "int32",
+    "reviews_count": "int32",
+}
 
-    print(f"[fim] {owner}/{repo}: {len(results)} PRs coletados (válidos)", flush=True)
-    return results
+class DatasetWriter:
+    # Grava as linhas conforme os repositórios terminam, em blocos de DATASET_CHUNK_ROWS
+    # (um row group por bloco no Parquet), mantendo em memória no máximo um bloco. Tudo vai para
+    # `<path>.tmp`, que só substitui o arquivo final se a coleta terminar sem exceção.
+    def __init__(self, path: str = OUTPUT_FILENAME, chunk_rows: int = DATASET_CHUNK_ROWS,
+                 dtypes: dict | None = None):
+        # `dtypes` troca o esquema padrão (ex.: rebuild.py acrescenta colunas de extratores extras).
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.chunk_rows = chunk_rows
+        self.dtypes = dtypes or DATASET_DTYPES
+        self.columns = list(self.dtypes)
+        self.format = "parquet" if path.endswith(".parquet") else "csv"
+        self.rows_written = 0
+        self._buffer = []
+        self._parquet = None
+        self._csv = None
+        if self.format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            self._pa = pa
+            pa_types = {"string": pa.string(), "int32": pa.int32(), "int64": pa.int64(), "float64": pa.float64()}
+            self._schema = pa.schema([(c, pa_types[t]) for c, t in self.dtypes.items()])
+            self._parquet = pq.ParquetWriter(self.tmp_path, self._schema, compression="zstd")
+        else:
+            self._csv = open(self.tmp_path, "w", encoding="utf-8", newline="")
+            self._csv.write(",".join(self.columns) + "\n")
+            self._csv.flush()
+
+    def write(self, rows: list[dict]):
+        self._buffer.extend(rows)
+        while len(self._buffer) >= self.chunk_rows:
+            chunk, self._buffer = self._buffer[:self.chunk_rows], self._buffer[self.chunk_rows:]
+            self._flush_chunk(chunk)
+
+    def _flush_chunk(self, chunk: list[dict]):
+        if not chunk:
+            return
+        import pandas as pd
+        df = pd.DataFrame(chunk, columns=self.columns).astype(self.dtypes)
+        if self._parquet is not None:
+            self._parquet.write_table(self._pa.Table.from_pandas(df, schema=self._schema, preserve_index=False))
+        else:
+            df.to_csv(self._csv, header=False, index=False)
+            self._csv.flush()
+        self.rows_written += len(df)
+
+    def close(self, ok: bool = True):
+        if ok:
+            self._flush_chunk(self._buffer)
+        self._buffer = []
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._csv is not None:
+            self._csv.close()
+        if not ok:
+            print(f"[output] Coleta interrompida: {os.path.abspath(self.path)} preservado, parcial em "
+                  f"{self.tmp_path} | linhas={self.rows_written}", flush=True)
+            return
+        os.replace(self.tmp_path, self.path)
+        print(f"[output] Arquivo gravado: {os.path.abspath(self.path)} | linhas={self.rows_written} | vazio={self.rows_written == 0}", flush=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(ok=exc_type is None)
+
+def _batched(iterable, size: int):
+    batch = []
+    for x in iterable:
+        batch.append(x)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_eligible(candidates, target: int, window: int = ELIGIBILITY_WINDOW):
+    # Consome os candidatos (ordem de estrelas) sob demanda, com no máximo `window` lotes em voo, e
+    # devolve os elegíveis na mesma ordem. Ao atingir o alvo, os lotes ainda não iniciados são cancelados.
+    def _eligibility_batch(batch):
+        counts = count_closed_prs([(r["owner"]["login"], r["name"]) for r in batch])
+        return [eligibility_item(r, total_closed) for r, total_closed in zip(batch, counts)]
+
+    batch_size = ELIGIBILITY_BATCH if ELIGIBILITY_STRATEGY == "graphql" else 1
+    batches = _batched(candidates, batch_size)
+    found = 0
+    pending = deque()
+    ex = ThreadPoolExecutor(max_workers=max(1, min(window, 32, MAX_WORKERS * max(1, len(TOKENS)))),
+                            thread_name_prefix="eligibility")
+    try:
+        for batch in itertools.islice(batches, window):
+            pending.append(ex.submit(_eligibility_batch, batch))
+        while pending:
+            for item in pending.popleft().result():
+                print(f"[eligibility] {item['key']} -> closed PRs={item['total_closed_prs']}", flush=True)
+                if item["total_closed_prs"] >= MIN_CLOSED_PRS:
+                    found += 1
+                    yield item
+                    if found >= target:
+                        return
+            for batch in itertools.islice(batches, 1):
+                pending.append(ex.submit(_eligibility_batch, batch))
+    finally:
+        if pending:
+            print(f"[eligibility] alvo atingido; cancelando {len(pending)} lotes pendentes", flush=True)
+        ex.shutdown(wait=False, cancel_futures=True)
+
+def run_threaded(sink: DatasetWriter, target: int = ELIGIBILITY_TARGET, collector: str = "rest",
+                 checkpoint: CheckpointStore | None = None, mode: str = "full"):
+    run_id = checkpoint.start_run(mode) if checkpoint else None
+
+    saved = checkpoint.last_eligible() if checkpoint and mode == "resume" else None
+    if saved:
+        print(f"[resume] Reaproveitando {len(saved)} repositórios elegíveis do checkpoint", flush=True)
+        source = iter(saved)
+    else:
+        print(f"Buscando repositórios por estrelas até completar {target} elegíveis...", flush=True)
+        source = iter_eligible(iter_top_repositories_sorted(max_pages=10), target)
+
+    if collector == "graphql":
+        from graphql_collector import get_pull_requests_graphql
+
+        def collect_prs(owner, name, since=None):
+            prs = get_pull_requests_graphql(owner, name, max_deep=MAX_DEEP_PRS_PER_REPO)
+            if checkpoint:
+                checkpoint.record_rows(f"{owner}/{name}", prs)
+            return prs
+    else:
+        def collect_prs(owner, name, since=None):
+            return iter_pull_requests(owner, name, max_deep=MAX_DEEP_PRS_PER_REPO, checkpoint=checkpoint, since=since)
+
+    sink_lock = threading.Lock()
 
+    def _collect_repo(item):
+        key = item["key"]
+        finished_at = checkpoint.repo_finished_at(key) if checkpoint else None
+        if finished_at and mode == "resume":
+            print(f"[resume] {key} já concluído; pulando", flush=True)
+            rows = checkpoint.load_rows(key)
+        else:
+            started = _now_ts()
+            rows = collect_prs(item["owner"], item["repo"], since=finished_at if mode == "incremental" else None)
+            if not checkpoint:
+                # Sem checkpoint as linhas vão direto para o arquivo, em lotes, conforme os PRs terminam.
+                for chunk in _batched(rows, DATASET_CHUNK_ROWS):
+                    with sink_lock:
+                        sink.write(annotate_repo_rows(chunk, item))
+                return
+            # O checkpoint já persiste cada página; basta consumir o gerador até o fim.
+            for _ in rows:
+                pass
+            checkpoint.mark_repo_done(key, started)
+            # Inclui as linhas de execuções anteriores (incremental), não só as desta.
+            rows = checkpoint.load_rows(key)
+        with sink_lock:
+            sink.write(annotate_repo_rows(rows, item))
+
+    # A coleta de cada repositório começa assim que ele é confirmado elegível, sem esperar o fim da etapa.
+    eligible = []
+    with ThreadPoolExecutor(max_workers=max(1, min(REPO_WORKERS, target, MAX_WORKERS)), thread_name_prefix="repo") as ex:
+        futs = []
+        for item in source:
+            eligible.append(item)
+            futs.append(ex.submit(_collect_repo, item))
+
+        print(f"[main] Elegíveis reunidos: {len(eligible)} (alvo={target})", flush=True)
+        if len(eligible) < target:
+            print(f"[main] AVISO: não foi possível atingir {target} dentro do limite da Search API. Aumente max_pages.", flush=True)
+        if checkpoint:
+            checkpoint.save_eligible(run_id, eligible)
 
-if __name__ == "__main__":
-    start_ts = datetime.now(timezone.utc)
-    print(f"[start] {start_ts.isoformat()} | cwd={os.getcwd()} | tokens={len(TOKENS)} | max_workers={MAX_WORKERS}", flush=True)
+        for fut in as_completed(futs):
+            fut.result()
 
-    TARGET = 200
-    eligible = []
-    repo_meta = {}
+    if checkpoint:
+        checkpoint.finish_run(run_id)
 
-    print("Buscando repositórios por estrelas até completar 200 elegíveis...", flush=True)
+    return eligible
 
-    candidates = list(iter_top_repositories_sorted(max_pages=10))
-    print(f"[eligibility] Candidatos recebidos da Search API: {len(candidates)}", flush=True)
+def run_profiled(fn, path: str, top: int = 30):
+    # Até o Python 3.11 o cProfile só enxerga a thread que o ativou; cada thread criada durante a coleta
+    # ganha o seu Profile e no fim tudo é somado num único .prof (pstats, snakeviz).
+    import cProfile
+    import pstats
 
-    def _eligibility_item(r):
-        owner = r["owner"]["login"]
-        name = r["name"]
-        key = f"{owner}/{name}"
-        stars = r.get("stargazers_count", 0)
-        html_url = r.get("html_url", "")
-        total_closed = get_closed_prs_count(owner, name)
-        return key, owner, name, stars, html_url, total_closed
+    profiles = [cProfile.Profile()]
+    lock = threading.Lock()
 
-    with ThreadPoolExecutor(max_workers=min(32, MAX_WORKERS * max(1, len(TOKENS)))) as ex:
-        futs = [ex.submit(_eligibility_item, r) for r in candidates]
-        for fut in as_completed(futs):
-            key, owner, name, stars, html_url, total_closed = fut.result()
-            print(f"[eligibility] {key} -> closed PRs={total_closed}", flush=True)
-            if total_closed >= 100 and len(eligible) < TARGET:
-                repo_meta[key] = {"stars": stars, "html_url": html_url}
-                eligible.append({
-                    "owner": owner,
-                    "repo": name,
-                    "key": key,
-                    "total_closed_prs": total_closed
-                })
-            if len(eligible) >= TARGET:
-                break
+    def _thread_hook(*_):
+        prof = cProfile.Profile()
+        with lock:
+            profiles.append(prof)
+        prof.enable()
 
-    print(f"[main] Elegíveis reunidos: {len(eligible)} (alvo={TARGET})", flush=True)
-    if len(eligible) < TARGET:
-        print("[main] AVISO: não foi possível atingir 200 dentro do limite da Search API. Aumente max_pages.", flush=True)
+    per_thread = sys.version_info < (3, 12)
+    if per_thread:
+        threading.setprofile(_thread_hook)
+    profiles[0].enable()
+    try:
+        return fn()
+    finally:
+        profiles[0].disable()
+        if per_thread:
+            threading.setprofile(None)
+        with lock:
+            stats = pstats.Stats(profiles[0])
+            for prof in profiles[1:]:
+                prof.disable()
+                try:
+                    stats.add(prof)
+                except TypeError:
+                    pass  # thread sem nenhuma chamada registrada
+        stats.dump_stats(path)
+        print(f"[profile] {len(profiles)} threads perfiladas -> {os.path.abspath(path)}", flush=True)
+        stats.sort_stats("cumulative").print_stats(top)
+
+
+def _require_tokens():
+    # Só coleta e elegibilidade precisam de token; stats e rebuild funcionam sem eles.
+    if not TOKENS:
+        raise SystemExit("Nenhum token encontrado. Defina GITHUB_TOKENS (comma-separated) ou GITHUB_TOKEN no ambiente.")
+
+
+def cmd_crawl(args, parser: argparse.ArgumentParser):
+    if args.engine == "async" and args.collector != "rest":
+        parser.error("--engine=async suporta apenas --collector=rest")
+    if args.engine == "async" and (args.resume or args.incremental):
+        parser.error("--resume/--incremental exigem --engine=threads")
+    mode = "resume" if args.resume else "incremental" if args.incremental else "full"
+    if args.engine == "async":
+        # Falha aqui, antes de o DatasetWriter existir, se faltar o aiohttp.
+        try:
+            import async_engine
+        except ImportError as e:
+            parser.error(f"--engine=async requer o pacote aiohttp ({e})")
+    _require_tokens()
 
-    dataset = []
+    start_ts = datetime.now(timezone.utc)
+    print(f"[start] {start_ts.isoformat()} | cwd={os.getcwd()} | tokens={len(TOKENS)} | max_workers={MAX_WORKERS} | engine={args.engine} | collector={args.collector} | mode={mode}", flush=True)
+
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+    if args.metrics_interval > 0:
+        start_metrics_reporter(args.metrics_interval)
+
+    def _crawl():
+        with DatasetWriter(OUTPUT_FILENAME) as sink:
+            if args.engine == "async":
+                eligible = async_engine.run(sink, ELIGIBILITY_TARGET)
+            else:
+                eligible = run_threaded(sink, ELIGIBILITY_TARGET, collector=args.collector,
+                                        checkpoint=CheckpointStore(CHECKPOINT_DB_PATH), mode=mode)
+        return eligible, sink
+
+    eligible, sink = run_profiled(_crawl, args.profile) if args.profile else _crawl()
+
+    t = CACHE.run_totals
+    print(f"[cache] hits={t['hits']} | 304={t['not_modified']} | misses={t['misses']} | stale={t['stale']} | "
+          f"requisições evitadas pela política de TTL={t['ttl_saved']}", flush=True)
+    if args.metrics_interval > 0:
+        print(f"[metrics] {json.dumps(METRICS.summary(), separators=(',', ':'))}", flush=True)
+    print(f"[end] {datetime.now(timezone.utc).isoformat()} | elegíveis={len(eligible)} | PRs={sink.rows_written}", flush=True)
+
+    if args.grouped_stats and sink.rows_written:
+        from analysis import refresh_grouped_stats
+        table = refresh_grouped_stats(OUTPUT_FILENAME, args.grouped_stats)
+        print(f"[grupos] {len(table)} grupos -> {args.grouped_stats}", flush=True)
+
+
+def cmd_eligibility(args, parser: argparse.ArgumentParser):
+    # Só a etapa de elegibilidade (Search API + contagem de PRs fechados), sem coletar PRs.
+    _require_tokens()
+    eligible = list(iter_eligible(iter_top_repositories_sorted(max_pages=10), args.target))
+    print(f"[main] Elegíveis reunidos: {len(eligible)} (alvo={args.target})", flush=True)
+    if args.output:
+        import csv
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["key", "owner", "repo", "stars", "html_url", "total_closed_prs"])
+            writer.writeheader()
+            writer.writerows(eligible)
+        print(f"[output] Arquivo gravado: {os.path.abspath(args.output)} | linhas={len(eligible)}", flush=True)
+
+
+def cmd_rebuild(args, parser: argparse.ArgumentParser):
+    import rebuild
+    rebuild.run_from_args(args, parser)
+
+
+def cmd_stats(args, parser: argparse.ArgumentParser):
+    if args.migrate:
+        converted, before, after = CACHE.migrate()
+        print(f"[cache] {converted} entradas convertidas ({CACHE.compression}, projeção={CACHE.projection}) | "
+              f"{before / 1e6:.1f} MB -> {after / 1e6:.1f} MB", flush=True)
+        return
+
+    if args.maintain:
+        evicted = CACHE.maintain(full=True)
+        print(f"[cache] manutenção concluída | despejadas={evicted} | arquivo={os.path.getsize(CACHE.path) / 1e6:.1f} MB", flush=True)
+        return
+
+    st = CACHE.stats()
+    print(f"[cache] {CACHE.path} | linhas={st['rows']} | payload={st['bytes'] / 1e6:.1f} MB | arquivo={st['file_bytes'] / 1e6:.1f} MB")
+    print(f"{'endpoint':<55} {'linhas':>9} {'MB':>8} {'hit%':>6} {'304%':>6} {'miss%':>6}")
+    for endpoint, e in sorted(st["endpoints"].items(), key=lambda kv: -kv[1]["bytes"]):
+        lookups = (e["hits"] + e["stale"] + e["misses"]) or 1
+        print(f"{endpoint:<55} {e['rows']:>9} {e['bytes'] / 1e6:>8.2f} {100 * e['hits'] / lookups:>6.1f} "
+              f"{100 * e['not_modified'] / lookups:>6.1f} {100 * e['misses'] / lookups:>6.1f}")
+
+
+# Flags de antes dos subcomandos, ainda aceitas: viram o subcomando equivalente.
+LEGACY_FLAGS = {"--cache-stats": ["stats"], "--cache-maintain": ["stats", "--maintain"],
+                "--migrate-cache": ["stats", "--migrate"]}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Coleta PRs revisados dos repositórios mais populares do GitHub.")
+    sub = parser.add_subparsers(dest="command", metavar="COMANDO")
+
+    crawl = sub.add_parser("crawl", help="coleta os PRs e grava o dataset (padrão sem subcomando)")
+    crawl.set_defaults(handler=cmd_crawl)
+    crawl.add_argument("--engine", choices=("threads", "async"), default=os.getenv("CRAWL_ENGINE", "threads"),
+                       help="threads: ThreadPoolExecutor aninhados; async: um único event loop (requer aiohttp)")
+    crawl.add_argument("--collector", choices=("rest", "graphql"), default=os.getenv("PR_COLLECTOR", "rest"),
+                       help="rest: 5 chamadas REST por PR; graphql: lotes de PRs por consulta GraphQL")
+    crawl.add_argument("--metrics-interval", type=float, default=METRICS_INTERVAL,
+                       help="a cada N segundos imprime uma linha [metrics] em JSON (0 desliga)")
+    crawl.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                       help="serve as métricas em formato Prometheus em 127.0.0.1:PORT/metrics (0 desliga)")
+    crawl.add_argument("--profile", nargs="?", const="crawl.prof", default=None, metavar="ARQUIVO",
+                       help="roda a coleta sob cProfile (todas as threads) e grava o .prof; para py-spy, "
+                            "as threads têm nomes por etapa (repo, pr, page, eligibility)")
+    crawl.add_argument("--grouped-stats", default=GROUPED_STATS_OUTPUT, metavar="ARQUIVO",
+                       help="ao fim da coleta, grava medianas e ρ/p das RQs por repositório e estado (analysis.py)")
+    mode_group = crawl.add_mutually_exclusive_group()
+    mode_group.add_argument("--resume", action="store_true",
+                            help="retoma a última execução, pulando repositórios e páginas já concluídos")
+    mode_group.add_argument("--incremental", action="store_true",
+                            help="busca apenas PRs fechados desde a última coleta de cada repositório")
+
+    eligibility = sub.add_parser("eligibility", help="só lista os repositórios elegíveis, sem coletar PRs")
+    eligibility.set_defaults(handler=cmd_eligibility)
+    eligibility.add_argument("--target", type=int, default=ELIGIBILITY_TARGET)
+    eligibility.add_argument("--output", default="", metavar="CSV", help="grava os elegíveis em CSV")
+
+    rebuild_cmd = sub.add_parser("rebuild", help="regera o dataset a partir do cache da API, sem rede (rebuild.py)")
+    rebuild_cmd.set_defaults(handler=cmd_rebuild)
+    from rebuild import add_rebuild_arguments
+    add_rebuild_arguments(rebuild_cmd)
+
+    stats = sub.add_parser("stats", help="linhas, bytes e hit/miss/304 do cache por endpoint")
+    stats.set_defaults(handler=cmd_stats)
+    stats_mode = stats.add_mutually_exclusive_group()
+    stats_mode.add_argument("--maintain", action="store_true",
+                            help="aplica CACHE_MAX_BYTES, VACUUM incremental e checkpoint do WAL")
+    stats_mode.add_argument("--migrate", action="store_true",
+                            help="converte o cache para o formato comprimido (CACHE_COMPRESSION/CACHE_PROJECTION)")
+    return parser
+
+
+def cli(argv: list[str] | None = None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    for flag, command in LEGACY_FLAGS.items():
+        if flag in argv:
+            argv = command
+            break
+    # Sem subcomando (ex.: `python main.py --resume`) continua sendo a coleta.
+    if not argv or argv[0] not in ("crawl", "eligibility", "rebuild", "stats", "-h", "--help"):
+        argv = ["crawl", *argv]
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    args.handler(args, parser)
 
-    def _collect_repo(item):
-        owner, name, key = item["owner"], item["repo"], item["key"]
-        prs = get_pull_requests(owner, name, max_deep=MAX_DEEP_PRS_PER_REPO)
-        meta = repo_meta.get(key, {"stars": 0, "html_url": ""})
-        for pr in prs:
-            pr.update({
-                "stars": meta["stars"],
-                "html_url": meta["html_url"],
-                "total_closed_prs": item["total_closed_prs"]
-            })
-        return prs
 
-    with ThreadPoolExecutor(max_workers=min(12, len(eligible), MAX_WORKERS)) as ex:
-        futs = [ex.submit(_collect_repo, item) for item in eligible]
-        for fut in as_completed(futs):
-            prs = fut.result()
-            dataset.extend(prs)
-
-    columns = [
-        "owner", "repo_name", "repo", "stars", "html_url", "total_closed_prs",
-        "pr_number", "state",
-        "num_files", "additions", "deletions",
-        "analysis_time_hours",
-        "description_length",
-        "participants_count", "comments_count",
-        "reviews_count",
-    ]
-    df = pd.DataFrame(dataset, columns=columns)
-    df.to_csv(OUTPUT_FILENAME, index=False)
-    print(f"[output] Arquivo gravado: {os.path.abspath(OUTPUT_FILENAME)} | linhas={len(df)} | vazio={df.empty}", flush=True)
-    print(f"[end] {datetime.now(timezone.utc).isoformat()} | elegíveis={len(eligible)} | PRs={len(df)}", flush=True)
\ No newline at end of file
+if __name__ == "__main__":
+    # Os módulos auxiliares (ex.: async_engine) fazem "import main"; reaproveita este módulo em vez de recarregá-lo.
+    sys.modules.setdefault("main", sys.modules[__name__])
+    cli()
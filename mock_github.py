@@ -0,0 +1,371 @@
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from functools import lru_cache
+from datetime import datetime, timezone, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+# Servidor local que imita as rotas da API REST do GitHub usadas por main.py, com dados sintéticos
+# determinísticos (mesma seed, mesmos repositórios e PRs) para medir o crawler sem gastar tokens.
+
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+SEARCH_MAX_RESULTS = 1000
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class MockConfig:
+    def __init__(self, repos: int = 30, prs_per_repo: int = 150, latency: float = 0.02, core_limit: int = 5000,
+                 search_limit: int = 30, rate_window: int = 60, secondary_rate: float = 0.0, retry_after: int = 1,
+                 error_rate: float = 0.0, seed: int = 42):
+        self.repos = repos
+        self.prs_per_repo = prs_per_repo
+        self.latency = latency
+        self.core_limit = core_limit
+        self.search_limit = search_limit
+        self.rate_window = rate_window
+        self.secondary_rate = secondary_rate
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.seed = seed
+
+
+class SyntheticData:
+    def __init__(self, cfg: MockConfig):
+        self.cfg = cfg
+        rng = random.Random(cfg.seed)
+        self.repos = []
+        for i in range(cfg.repos):
+            # Parte dos repositórios fica abaixo de MIN_CLOSED_PRS para exercitar o filtro de elegibilidade.
+            n_prs = rng.randint(cfg.prs_per_repo // 2, cfg.prs_per_repo * 3 // 2)
+            self.repos.append({"id": i + 1, "owner": f"org{i % 7}", "name": f"repo{i}", "stars": 100000 - i * 37,
+                               "prs": n_prs})
+        self.by_key = {f"{r['owner']}/{r['name']}": r for r in self.repos}
+
+    def search_item(self, r: dict) -> dict:
+        return {
+            "id": r["id"],
+            "name": r["name"],
+            "full_name": f"{r['owner']}/{r['name']}",
+            "owner": {"login": r["owner"], "type": "Organization"},
+            "html_url": f"https://github.com/{r['owner']}/{r['name']}",
+            "stargazers_count": r["stars"],
+        }
+
+    @lru_cache(maxsize=None)
+    def pull(self, key: str, number: int) -> dict:
+        rng = random.Random(f"{self.cfg.seed}:{key}#{number}")
+        created = EPOCH + timedelta(hours=number * 5 + rng.randint(0, 4))
+        # ~15% fecham em menos de 1 h (descartados pelo pré-filtro); o resto leva de horas a semanas.
+        hours = rng.uniform(0.1, 0.9) if rng.random() < 0.15 else rng.uniform(1, 24 * 20)
+        closed = created + timedelta(hours=hours)
+        merged = rng.random() < 0.7
+        body = "Descrição do PR. " * rng.randint(0, 60)
+        return {
+            "number": number,
+            "state": "closed",
+            "title": f"PR {number} de {key}",
+            "user": {"login": f"author{rng.randint(0, 40)}", "type": "User"},
+            "body": body,
+            "created_at": _iso(created),
+            "updated_at": _iso(closed + timedelta(minutes=rng.randint(0, 600))),
+            "closed_at": _iso(closed),
+            "merged_at": _iso(closed) if merged else None,
+            "comments": rng.randint(0, 10),
+            "review_comments": rng.randint(0, 15),
+            "additions": 0,
+            "deletions": 0,
+            "changed_files": 0,
+            "_reviews": 0 if rng.random() < 0.25 else rng.randint(1, 6),
+            "_issue_comments": rng.randint(0, 8),
+            "_review_comments": rng.randint(0, 12),
+            "_files": rng.randint(1, 140),
+        }
+
+    def pulls(self, key: str, sort: str | None) -> list[dict]:
+        prs = [self.pull(key, n) for n in range(self.by_key[key]["prs"], 0, -1)]
+        if sort == "updated":
+            prs.sort(key=lambda p: p["updated_at"], reverse=True)
+        return prs
+
+    def sub_resource(self, key: str, number: int, kind: str) -> list[dict]:
+        pr = self.pull(key, number)
+        rng = random.Random(f"{self.cfg.seed}:{key}#{number}:{kind}")
+        if kind == "reviews":
+            return [{"id": number * 100 + i, "user": {"login": f"reviewer{rng.randint(0, 30)}"},
+                     "state": rng.choice(("APPROVED", "COMMENTED", "CHANGES_REQUESTED")),
+                     "body": "LGTM", "submitted_at": pr["closed_at"]} for i in range(pr["_reviews"])]
+        if kind in ("issue_comments", "review_comments"):
+            return [{"id": number * 1000 + i, "user": {"login": f"user{rng.randint(0, 60)}"},
+                     "body": "Comentário.", "created_at": pr["created_at"]} for i in range(pr[f"_{kind}"])]
+        return [{"filename": f"src/module{i}.py", "status": "modified", "additions": rng.randint(0, 80),
+                 "deletions": rng.randint(0, 40), "changes": 0} for i in range(pr["_files"])]
+
+
+def _public(pr: dict) -> dict:
+    return {k: v for k, v in pr.items() if not k.startswith("_")}
+
+
+class RateLimiter:
+    # Janela fixa por (token, recurso), com os mesmos cabeçalhos X-RateLimit-* que a API devolve.
+    def __init__(self, limits: dict, window: int):
+        self.limits = limits
+        self.window = window
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def consume(self, token: str, resource: str) -> tuple[bool, dict]:
+        now = int(time.time())
+        with self._lock:
+            reset, used = self._state.get((token, resource), (now + self.window, 0))
+            if now >= reset:
+                reset, used = now + self.window, 0
+            limit = self.limits[resource]
+            allowed = used < limit
+            if allowed:
+                used += 1
+            self._state[(token, resource)] = (reset, used)
+        return allowed, {"X-RateLimit-Limit": str(limit), "X-RateLimit-Remaining": str(limit - used),
+                         "X-RateLimit-Used": str(used), "X-RateLimit-Reset": str(reset),
+                         "X-RateLimit-Resource": resource}
+
+
+class MockGitHubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512
+
+    def __init__(self, cfg: MockConfig, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), MockGitHubHandler)
+        self.cfg = cfg
+        self.data = SyntheticData(cfg)
+        self.limiter = RateLimiter({"core": cfg.core_limit, "search": cfg.search_limit, "graphql": cfg.core_limit},
+                                   cfg.rate_window)
+        self.rng = random.Random(cfg.seed)
+        self.status_counts = Counter()
+        self.penalties = {}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, status: int):
+        with self._stats_lock:
+            self.status_counts[status] += 1
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.status_counts.clear()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {"requests": sum(self.status_counts.values()), "status": dict(self.status_counts)}
+
+    def roll(self, p: float) -> bool:
+        with self._stats_lock:
+            return p > 0 and self.rng.random() < p
+
+    def secondary_penalty(self, token: str) -> float:
+        # Como na API real, o limite secundário vale para o token inteiro até o Retry-After vencer:
+        # segundos restantes de punição, sorteando uma nova com probabilidade secondary_rate.
+        now = time.time()
+        with self._stats_lock:
+            until = self.penalties.get(token, 0.0)
+            if until <= now and self.cfg.secondary_rate > 0 and self.rng.random() < self.cfg.secondary_rate:
+                until = self.penalties[token] = now + self.cfg.retry_after
+        return max(0.0, until - now)
+
+
+ROUTES = [
+    (re.compile(r"^/search/repositories$"), "search_repositories"),
+    (re.compile(r"^/search/issues$"), "search_issues"),
+    (re.compile(r"^/repos/([^/]+/[^/]+)/pulls$"), "list_pulls"),
+    (re.compile(r"^/repos/([^/]+/[^/]+)/pulls/(\d+)$"), "pull_detail"),
+    (re.compile(r"^/repos/([^/]+/[^/]+)/pulls/(\d+)/reviews$"), "reviews"),
+    (re.compile(r"^/repos/([^/]+/[^/]+)/issues/(\d+)/comments$"), "issue_comments"),
+    (re.compile(r"^/repos/([^/]+/[^/]+)/pulls/(\d+)/comments$"), "review_comments"),
+    (re.compile(r"^/repos/([^/]+/[^/]+)/pulls/(\d+)/files$"), "files"),
+]
+
+
+class MockGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, payload=None, headers: dict | None = None):
+        body = b"" if payload is None else json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+        self.server.count(status)
+
+    def _token(self) -> str:
+        auth = self.headers.get("Authorization") or ""
+        return auth.split(" ", 1)[1] if " " in auth else ""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(self.server.cfg.latency)
+        # O mock cobre só o coletor REST; o GraphQL responde com erro para o cliente desistir sem retentativas.
+        self._send(200, {"data": None, "errors": [{"type": "NOT_SUPPORTED",
+                                                   "message": "GraphQL não é servido pelo mock_github"}]})
+
+    def do_GET(self):
+        srv = self.server
+        cfg = srv.cfg
+        time.sleep(cfg.latency)
+        parts = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+
+        if srv.roll(cfg.error_rate):
+            return self._send(502, {"message": "Server Error"})
+        penalty = srv.secondary_penalty(self._token())
+        if penalty > 0:
+            return self._send(403, {"message": "You have exceeded a secondary rate limit."},
+                              {"Retry-After": str(max(1, round(penalty)))})
+
+        resource = "search" if parts.path.startswith("/search/") else "core"
+        allowed, rate = srv.limiter.consume(self._token(), resource)
+        if not allowed:
+            return self._send(403, {"message": "API rate limit exceeded"}, rate)
+
+        for pattern, name in ROUTES:
+            m = pattern.match(parts.path)
+            if m:
+                break
+        else:
+            return self._send(404, {"message": "Not Found"}, rate)
+
+        key = m.group(1) if name not in ("search_repositories", "search_issues") else None
+        repo = srv.data.by_key.get(key) if key is not None else None
+        if key is not None and (repo is None or (m.lastindex == 2 and not 1 <= int(m.group(2)) <= repo["prs"])):
+            return self._send(404, {"message": "Not Found"}, rate)
+        payload, items = getattr(self, f"_{name}")(m, query, key)
+
+        headers = dict(rate)
+        if items is not None:
+            payload, link = self._paginate(items, query, parts.path)
+            if link:
+                headers["Link"] = link
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+        headers["ETag"] = etag
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, None, headers)
+        self._send(200, payload, headers)
+
+    def _paginate(self, items: list, query: dict, path: str) -> tuple[list, str | None]:
+        per_page = max(1, min(100, int(query.get("per_page", 30))))
+        page = max(1, int(query.get("page", 1)))
+        last = max(1, -(-len(items) // per_page))
+        chunk = items[(page - 1) * per_page:page * per_page]
+        rels = [("prev", page - 1), ("first", 1)] if page > 1 else []
+        rels += [("next", page + 1), ("last", last)] if page < last else []
+        links = []
+        for rel, pg in rels:
+            links.append(f'<{self.server.base_url}{path}?{urlencode({**query, "page": pg})}>; rel="{rel}"')
+        return chunk, ", ".join(links) or None
+
+    def _search_repositories(self, m, query, key):
+        per_page = max(1, min(100, int(query.get("per_page", 30))))
+        page = max(1, int(query.get("page", 1)))
+        repos = sorted(self.server.data.repos, key=lambda r: -r["stars"])[:SEARCH_MAX_RESULTS]
+        chunk = repos[(page - 1) * per_page:page * per_page]
+        return {"total_count": len(self.server.data.repos), "incomplete_results": False,
+                "items": [self.server.data.search_item(r) for r in chunk]}, None
+
+    def _search_issues(self, m, query, key):
+        repo = re.search(r"repo:(\S+)", query.get("q", ""))
+        found = self.server.data.by_key.get(repo.group(1)) if repo else None
+        return {"total_count": found["prs"] if found else 0, "incomplete_results": False, "items": []}, None
+
+    def _list_pulls(self, m, query, key):
+        sort = query.get("sort")
+        return None, [_public(pr) for pr in self.server.data.pulls(key, sort)]
+
+    def _pull_detail(self, m, query, key):
+        number = int(m.group(2))
+        pr = self.server.data.pull(key, number)
+        files = self.server.data.sub_resource(key, number, "files")
+        detail = _public(pr)
+        detail.update({"additions": sum(f["additions"] for f in files),
+                       "deletions": sum(f["deletions"] for f in files), "changed_files": len(files)})
+        return detail, None
+
+    def _sub(self, m, key, kind):
+        return None, self.server.data.sub_resource(key, int(m.group(2)), kind)
+
+    def _reviews(self, m, query, key):
+        return self._sub(m, key, "reviews")
+
+    def _issue_comments(self, m, query, key):
+        return self._sub(m, key, "issue_comments")
+
+    def _review_comments(self, m, query, key):
+        return self._sub(m, key, "review_comments")
+
+    def _files(self, m, query, key):
+        return self._sub(m, key, "files")
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    d = MockConfig()
+    parser.add_argument("--repos", type=int, default=d.repos, help="repositórios sintéticos")
+    parser.add_argument("--prs", type=int, default=d.prs_per_repo, help="PRs fechados por repositório (média)")
+    parser.add_argument("--latency", type=float, default=d.latency, help="latência por resposta (s)")
+    parser.add_argument("--core-limit", type=int, default=d.core_limit, help="cota core por token na janela")
+    parser.add_argument("--search-limit", type=int, default=d.search_limit, help="cota search por token na janela")
+    parser.add_argument("--rate-window", type=int, default=d.rate_window, help="duração da janela de cota (s)")
+    parser.add_argument("--secondary-rate", type=float, default=d.secondary_rate,
+                        help="chance de uma requisição pôr o token sob limite secundário (403 até o Retry-After)")
+    parser.add_argument("--retry-after", type=int, default=d.retry_after, help="Retry-After dos 403 secundários (s)")
+    parser.add_argument("--error-rate", type=float, default=d.error_rate, help="fração das requisições com 502")
+    parser.add_argument("--seed", type=int, default=d.seed)
+
+
+def config_from_args(args) -> MockConfig:
+    return MockConfig(repos=args.repos, prs_per_repo=args.prs, latency=args.latency, core_limit=args.core_limit,
+                      search_limit=args.search_limit, rate_window=args.rate_window,
+                      secondary_rate=args.secondary_rate, retry_after=args.retry_after,
+                      error_rate=args.error_rate, seed=args.seed)
+
+
+def start_in_thread(cfg: MockConfig, host: str = "127.0.0.1", port: int = 0) -> MockGitHubServer:
+    server = MockGitHubServer(cfg, host, port)
+    threading.Thread(target=server.serve_forever, name="mock-github", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API do GitHub simulada para medir o crawler offline.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockGitHubServer(config_from_args(args), args.host, args.port)
+    print(f"[mock] servindo em {server.base_url} | use GITHUB_API_URL={server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[mock] {server.stats()}", flush=True)
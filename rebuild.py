@@ -0,0 +1,285 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from main import (
+    BASE_URL, CACHE_DB_PATH, CHECKPOINT_DB_PATH, MAX_DEEP_PRS_PER_REPO, DATASET_DTYPES,
+    CheckpointStore, DatasetWriter, _cache_key, _decode_payload, _last_page, _link_unknown, _iso_to_dt,
+    _pr_duration_hours, prefilter_listed_prs, build_pr_row, annotate_repo_rows,
+)
+
+# Reconstrói o dataset só com o que já está no cache da API (.cache/github_api_cache.sqlite), sem rede:
+# lê /pulls, /reviews, /comments e /files pelas mesmas chaves que safe_get usaria, junta por PR e passa
+# cada PR pelos extratores de features escolhidos. Um repositório por tarefa, em processos.
+
+REBUILD_OUTPUT = os.getenv("REBUILD_OUTPUT", "dataset_rebuilt.csv")
+REBUILD_WORKERS = int(os.getenv("REBUILD_WORKERS", str(os.cpu_count() or 1)))
+REBUILD_FEATURES = os.getenv("REBUILD_FEATURES", "core")
+
+# Extratores: nome -> (função, colunas e tipos que ela acrescenta). A função recebe o contexto do PR
+# (owner, repo, pr da listagem, detail, reviews, issue_comments, review_comments, files, duration_h) e devolve
+# um dict com as colunas. Módulos passados em --plugin registram os seus com @feature ao serem importados.
+# Com CACHE_PROJECTION=1 o cache só guarda os campos de CACHE_PROJECTIONS; o resto chega como ausente.
+FEATURES = {}
+
+REPO_COLUMNS = ("stars", "html_url", "total_closed_prs")
+
+
+def feature(name: str, columns: dict[str, str]):
+    def register(fn):
+        FEATURES[name] = (fn, columns)
+        return fn
+    return register
+
+
+@feature("core", {c: t for c, t in DATASET_DTYPES.items() if c not in REPO_COLUMNS})
+def core_features(ctx: dict) -> dict:
+    return build_pr_row(ctx["owner"], ctx["repo"], ctx["pr"], ctx["duration_h"], ctx["reviews"], ctx["detail"],
+                        ctx["issue_comments"], ctx["review_comments"], ctx["files"])
+
+
+@feature("review_latency", {"first_review_hours": "float64"})
+def review_latency(ctx: dict) -> dict:
+    submitted = [_iso_to_dt(rv["submitted_at"]) for rv in ctx["reviews"] if rv.get("submitted_at")]
+    if not submitted or not ctx["pr"].get("created_at"):
+        return {"first_review_hours": float("nan")}
+    return {"first_review_hours": (min(submitted) - _iso_to_dt(ctx["pr"]["created_at"])).total_seconds() / 3600.0}
+
+
+@feature("reviewers", {"reviewers_count": "int32"})
+def distinct_reviewers(ctx: dict) -> dict:
+    author = (ctx["pr"].get("user") or {}).get("login")
+    logins = {(rv.get("user") or {}).get("login") for rv in ctx["reviews"]}
+    return {"reviewers_count": len(logins - {None, author})}
+
+
+def output_dtypes(names: list[str]) -> dict:
+    # Esquema do arquivo: o de main.py e, depois, as colunas dos extratores extras na ordem pedida.
+    dtypes = dict(DATASET_DTYPES)
+    for name in names:
+        dtypes.update(FEATURES[name][1])
+    return dtypes
+
+
+class CacheReader:
+    # Acesso somente leitura ao SQLite do cache, sem o SQLiteCache (nem writer, nem estatísticas, nem TTL:
+    # offline, qualquer entrada serve).
+    def __init__(self, path: str):
+        self.con = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+    def get(self, url: str, params: dict | None = None):
+        row = self.con.execute(
+            "SELECT response_json, encoding, response_blob, link_header FROM cache WHERE cache_key=?",
+            (_cache_key(url, params),)).fetchone()
+        if row is None:
+            return None
+        response_json, encoding, blob, link = row
+        return _decode_payload(encoding, blob, response_json), link
+
+    def pages(self, url: str, params: dict | None = None, per_page: int = 100) -> tuple[list, bool]:
+        # Mesma paginação de main.iter_pages: (payloads em ordem, se todas as páginas estavam no cache).
+        base = {**(params or {}), "per_page": per_page}
+        first = self.get(url, {**base, "page": 1})
+        if first is None:
+            return [], False
+        data, link = first
+        payloads = [data]
+        if _link_unknown(link, data, base):
+            # Cache anterior ao Link gravado: segue página a página até uma incompleta, como o coletor antigo.
+            pg = 2
+            while _link_unknown(None, payloads[-1], base):
+                cached = self.get(url, {**base, "page": pg})
+                if cached is None:
+                    return payloads, False
+                payloads.append(cached[0])
+                pg += 1
+            return payloads, True
+        last = _last_page(link) if data else None
+        for pg in range(2, (last or 1) + 1):
+            cached = self.get(url, {**base, "page": pg})
+            if cached is None:
+                return payloads, False
+            payloads.append(cached[0])
+        return payloads, True
+
+    def items(self, url: str) -> list | None:
+        # Lista completa de um endpoint paginado do PR, ou None se alguma página faltar no cache.
+        payloads, complete = self.pages(url)
+        if not complete:
+            return None
+        items = []
+        for data in payloads:
+            if not isinstance(data, list):
+                break
+            items.extend(x for x in data if isinstance(x, dict))
+        return items
+
+    def listed_repositories(self) -> list[str]:
+        # Repositórios com a listagem de PRs no cache (chave "owner/repo"), mesmo sem checkpoint.
+        prefix = f"{BASE_URL}/repos/"
+        cur = self.con.execute("SELECT DISTINCT url FROM cache WHERE url LIKE ?", (f"{prefix}%/pulls",))
+        keys = (url[len(prefix):-len("/pulls")] for (url,) in cur)
+        return sorted(k for k in keys if k.count("/") == 1)
+
+
+def listed_prs(reader: CacheReader, owner: str, repo: str, max_deep: int | None = MAX_DEEP_PRS_PER_REPO) -> list[dict]:
+    # Os mesmos candidatos que iter_pull_requests agendaria (listagem completa, até max_deep), mais os PRs
+    # que só apareceram nas listagens do modo --incremental.
+    url = f"{BASE_URL}/repos/{owner}/{repo}/pulls"
+    prs, seen = [], set()
+    for data in reader.pages(url, {"state": "closed"})[0]:
+        if not data or not isinstance(data, list):
+            break
+        for pr in prefilter_listed_prs(data):
+            if max_deep is not None and len(prs) >= max_deep:
+                break
+            prs.append(pr)
+            seen.add(pr["number"])
+    for data in reader.pages(url, {"state": "closed", "sort": "updated", "direction": "desc"})[0]:
+        if not data or not isinstance(data, list):
+            break
+        for pr in prefilter_listed_prs(data):
+            if pr["number"] not in seen:
+                prs.append(pr)
+                seen.add(pr["number"])
+    return prs
+
+
+def pr_context(reader: CacheReader, owner: str, repo: str, pr: dict) -> dict | None:
+    # Junta as respostas de um PR; None quando alguma não está no cache (PR não coletado ou coleta interrompida).
+    base = f"{BASE_URL}/repos/{owner}/{repo}"
+    n = pr["number"]
+    reviews = reader.items(f"{base}/pulls/{n}/reviews")
+    if reviews is None:
+        return None
+    ctx = {"owner": owner, "repo": repo, "pr": pr, "duration_h": _pr_duration_hours(pr), "reviews": reviews}
+    if not reviews:
+        return ctx
+    detail = reader.get(f"{base}/pulls/{n}")
+    ctx.update({
+        "detail": (detail[0] or {}) if detail else None,
+        "issue_comments": reader.items(f"{base}/issues/{n}/comments"),
+        "review_comments": reader.items(f"{base}/pulls/{n}/comments"),
+        "files": reader.items(f"{base}/pulls/{n}/files"),
+    })
+    if any(ctx[k] is None for k in ("detail", "issue_comments", "review_comments", "files")):
+        return None
+    return ctx
+
+
+_READER = None
+
+
+def _init_worker(cache_path: str, plugins: list[str]):
+    global _READER
+    for module in plugins:
+        importlib.import_module(module)
+    _READER = CacheReader(cache_path)
+
+
+def rebuild_repo(item: dict, names: list[str], max_deep: int | None = MAX_DEEP_PRS_PER_REPO) -> tuple[list[dict], dict]:
+    owner, repo = item["owner"], item["repo"]
+    counts = {"listed": 0, "rows": 0, "unreviewed": 0, "missing": 0}
+    rows = []
+    for pr in listed_prs(_READER, owner, repo, max_deep):
+        counts["listed"] += 1
+        ctx = pr_context(_READER, owner, repo, pr)
+        if ctx is None:
+            counts["missing"] += 1
+            continue
+        if not ctx["reviews"]:
+            counts["unreviewed"] += 1
+            continue
+        row = {}
+        for name in names:
+            row.update(FEATURES[name][0](ctx))
+        rows.append(row)
+    counts["rows"] = len(rows)
+    return annotate_repo_rows(rows, item), counts
+
+
+def repositories(reader: CacheReader, checkpoint_path: str = CHECKPOINT_DB_PATH, only: list[str] | None = None) -> list[dict]:
+    # Estrelas e total de PRs fechados vêm da última lista de elegíveis do checkpoint; repositórios que só
+    # estão no cache entram com esses campos zerados.
+    saved = CheckpointStore(checkpoint_path).last_eligible() if os.path.exists(checkpoint_path) else None
+    items = {it["key"]: it for it in saved or []}
+    for key in reader.listed_repositories():
+        if key not in items:
+            owner, repo = key.split("/")
+            items[key] = {"owner": owner, "repo": repo, "key": key, "stars": 0, "html_url": "", "total_closed_prs": 0}
+    return [it for key, it in items.items() if only is None or key in only]
+
+
+def rebuild(output: str = REBUILD_OUTPUT, names: list[str] | None = None, plugins: list[str] | None = None,
+            cache_path: str = CACHE_DB_PATH, workers: int = REBUILD_WORKERS, only: list[str] | None = None,
+            max_deep: int | None = MAX_DEEP_PRS_PER_REPO) -> dict:
+    names = ["core"] + [n for n in (names or []) if n != "core"]
+    plugins = plugins or []
+    for module in plugins:
+        importlib.import_module(module)
+    unknown = [n for n in names if n not in FEATURES]
+    if unknown:
+        raise ValueError(f"extrator desconhecido: {', '.join(unknown)} (disponíveis: {', '.join(FEATURES)})")
+    items = repositories(CacheReader(cache_path), only=only)
+
+    totals = {"repos": len(items), "listed": 0, "rows": 0, "unreviewed": 0, "missing": 0}
+    with DatasetWriter(output, dtypes=output_dtypes(names)) as sink, \
+            ProcessPoolExecutor(max_workers=max(1, min(workers, len(items) or 1)), initializer=_init_worker,
+                                initargs=(cache_path, plugins)) as ex:
+        futs = {ex.submit(rebuild_repo, item, names, max_deep): item["key"] for item in items}
+        for fut in as_completed(futs):
+            rows, counts = fut.result()
+            sink.write(rows)
+            for k, v in counts.items():
+                totals[k] += v
+            print(f"[rebuild] {futs[fut]}: {counts['rows']} PRs"
+                  + (f", {counts['missing']} incompletos no cache" if counts["missing"] else ""), flush=True)
+    return totals
+
+
+def add_rebuild_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--output", default=REBUILD_OUTPUT, help="CSV ou .parquet de saída")
+    parser.add_argument("--features", default=REBUILD_FEATURES,
+                        help="extratores separados por vírgula; 'core' (colunas de main.py) sempre entra")
+    parser.add_argument("--plugin", action="append", default=[], metavar="MÓDULO",
+                        help="módulo que registra extratores com @rebuild.feature (pode repetir)")
+    parser.add_argument("--cache", default=CACHE_DB_PATH, help="SQLite do cache da API")
+    parser.add_argument("--repo", action="append", default=None, metavar="OWNER/REPO", help="só estes repositórios")
+    parser.add_argument("--max-deep", type=int, default=MAX_DEEP_PRS_PER_REPO)
+    parser.add_argument("--workers", type=int, default=REBUILD_WORKERS)
+    parser.add_argument("--list-features", action="store_true")
+
+
+def run_from_args(args, parser: argparse.ArgumentParser):
+    # Compartilhado por `python rebuild.py` e `python main.py rebuild`.
+    for module in args.plugin:
+        importlib.import_module(module)
+    if args.list_features:
+        for name, (_, columns) in FEATURES.items():
+            print(f"{name:<16} {', '.join(columns)}")
+        return
+    if not os.path.exists(args.cache):
+        parser.error(f"cache não encontrado: {args.cache}")
+
+    t0 = time.perf_counter()
+    names = [n.strip() for n in args.features.split(",") if n.strip()]
+    try:
+        totals = rebuild(args.output, names, args.plugin, args.cache, args.workers, args.repo, args.max_deep)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"[rebuild] {totals['repos']} repositórios | PRs listados={totals['listed']} | linhas={totals['rows']} | "
+          f"sem review={totals['unreviewed']} | incompletos no cache={totals['missing']} | "
+          f"{time.perf_counter() - t0:.2f}s", flush=True)
+
+
+if __name__ == "__main__":
+    # Plugins fazem "from rebuild import feature"; registram neste módulo, não numa segunda cópia.
+    sys.modules.setdefault("rebuild", sys.modules[__name__])
+
+    parser = argparse.ArgumentParser(description="Regera o dataset a partir do cache da API, sem acessar a rede.")
+    add_rebuild_arguments(parser)
+    run_from_args(parser.parse_args(), parser)
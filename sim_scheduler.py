@@ -0,0 +1,150 @@
+import sys
+import time
+import argparse
+import threading
+
+from main import TokenScheduler
+
+
+class FakeClock:
+    # Relógio controlado pela simulação; o TokenScheduler só enxerga o tempo por ele.
+    def __init__(self, start: float = 1_700_000_000.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+def rate_headers(remaining: int, reset: float, limit: int = 5000, resource: str = "core") -> dict:
+    return {"X-RateLimit-Limit": str(limit), "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(int(reset)), "X-RateLimit-Resource": resource}
+
+
+def make_scheduler(n_tokens: int, max_in_flight: int, clock: FakeClock) -> TokenScheduler:
+    return TokenScheduler([f"tok{i:04d}" for i in range(n_tokens)], max_in_flight=max_in_flight, clock=clock)
+
+
+def observe(sched: TokenScheduler, sess, headers: dict, resource: str = "core"):
+    # Simula uma resposta: pega o lease do token e devolve com os cabeçalhos de cota informados.
+    lease = sched.acquire(resource)
+    assert lease is sess, "observe() precisa de um token livre e com a maior cota"
+    sched.release(lease, resource, headers)
+
+
+def drain(sched: TokenScheduler, resource: str = "core") -> list:
+    # Adquire leases enquanto algum token puder despachar sem esperar.
+    leases = []
+    while sched._best(resource, sched.clock()) is not None:
+        leases.append(sched.acquire(resource))
+    return leases
+
+
+def acquire_async(sched: TokenScheduler, resource: str = "core"):
+    got = []
+    t = threading.Thread(target=lambda: got.append(sched.acquire(resource)), daemon=True)
+    t.start()
+    return t, got
+
+
+def check_most_headroom():
+    clock = FakeClock()
+    sched = make_scheduler(3, 8, clock)
+    a, b, c = sched.pool
+    reset = clock() + 3600
+    for sess, remaining in ((a, 100), (b, 900), (c, 400)):
+        sess.buckets["core"].remaining = remaining
+        sess.buckets["core"].reset_epoch = int(reset)
+    lease = sched.acquire()
+    assert lease is b, f"esperado o token com mais cota, veio ...{lease.token[-4:]}"
+    sched.release(lease, "core", rate_headers(50, reset))
+    lease = sched.acquire()
+    assert lease is c, f"após o token B cair para 50, esperado C, veio ...{lease.token[-4:]}"
+    sched.release(lease)
+
+
+def check_max_in_flight():
+    clock = FakeClock()
+    sched = make_scheduler(2, 3, clock)
+    leases = drain(sched)
+    assert len(leases) == 6, f"2 tokens x max_in_flight=3 deveriam render 6 leases, renderam {len(leases)}"
+    assert all(s.in_flight == 3 for s in sched.pool)
+    sched.release(leases[0])
+    assert sched._best("core", clock()) is leases[0], "a vaga devolvida deveria ser a próxima a despachar"
+
+
+def check_remaining_is_counted_once():
+    clock = FakeClock()
+    sched = make_scheduler(1, 8, clock)
+    (sess,) = sched.pool
+    observe(sched, sess, rate_headers(4, clock() + 600))
+    leases = drain(sched)
+    assert len(leases) == 4, f"Remaining=4 deveria render 4 leases, rendeu {len(leases)}"
+
+
+def check_park_and_resume():
+    clock = FakeClock()
+    sched = make_scheduler(1, 8, clock)
+    (sess,) = sched.pool
+    reset = clock() + 60
+    observe(sched, sess, rate_headers(1, reset))
+    first = sched.acquire()
+    t, got = acquire_async(sched)
+    t.join(0.3)
+    assert t.is_alive() and not got, "sem cota em nenhum token, o chamador deveria esperar"
+    clock.advance(61)
+    sched.release(first, "core", rate_headers(5000, clock() + 3600))
+    t.join(2)
+    assert got == [sess], "após o reset, o chamador parado deveria receber o token"
+    sched.release(got[0])
+
+
+def check_quarantine():
+    clock = FakeClock()
+    sched = make_scheduler(2, 8, clock)
+    a, b = sched.pool
+    reset = clock() + 3600
+    for sess, remaining in ((a, 4000), (b, 1000)):
+        sess.buckets["core"].remaining = remaining
+        sess.buckets["core"].reset_epoch = int(reset)
+    sched.quarantine(a, "core", clock() + 60, "secondary")
+    lease = sched.acquire()
+    assert lease is b, "o token em quarentena não deveria ser escolhido"
+    sched.release(lease)
+    clock.advance(61)
+    lease = sched.acquire()
+    assert lease is a, "terminada a quarentena, o token com mais cota volta a ser o preferido"
+    sched.release(lease)
+
+
+CHECKS = {
+    "most_headroom": check_most_headroom,
+    "max_in_flight": check_max_in_flight,
+    "remaining_once": check_remaining_is_counted_once,
+    "park_and_resume": check_park_and_resume,
+    "quarantine": check_quarantine,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Simulação do TokenScheduler com relógio e cabeçalhos de cota falsos; sai com código 1 se falhar.")
+    parser.add_argument("checks", nargs="*", help=f"cenários a rodar (padrão: todos): {', '.join(CHECKS)}")
+    args = parser.parse_args()
+    unknown = set(args.checks) - set(CHECKS)
+    if unknown:
+        parser.error(f"cenários desconhecidos: {', '.join(sorted(unknown))}")
+
+    failed = 0
+    for name in args.checks or CHECKS:
+        t0 = time.perf_counter()
+        try:
+            CHECKS[name]()
+        except AssertionError as e:
+            failed += 1
+            print(f"[sim] FALHA {name}: {e}", flush=True)
+            continue
+        print(f"[sim] OK {name} ({time.perf_counter() - t0:.2f}s)", flush=True)
+    sys.exit(1 if failed else 0)